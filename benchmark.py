@@ -0,0 +1,365 @@
+"""
+Advanced Data Processor - benchmark suite
+=========================================
+
+Generates synthetic datasets, then times every load path of the processing
+core (the same load_data() the GUI's FastDataLoadThread runs) and the core
+calls behind each fast_* operation and export. Each benchmark records wall
+time, CPU time, peak traced memory and rows per second; results are written
+as JSON so runs can be compared between versions:
+
+    python benchmark.py --sizes 100k,1M --shapes tall,wide --output before.json
+    python benchmark.py --sizes 100k,1M --shapes tall,wide --output after.json --compare before.json
+
+Sizes are row counts (100k, 2M) or CSV file sizes (500MB, 4GB). Data is
+generated chunk by chunk, so multi-GB files need no more memory than one
+chunk; formats other than CSV are only converted up to --convert-max-rows.
+"""
+
+import sys
+import argparse
+import datetime
+import gc
+import json
+import math
+import os
+import platform
+import re
+import shutil
+import subprocess
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pandas as pd
+from processor import (
+    ColumnStats, DatasetSketch, LoadCache, OperationJournal, apply_steps, approximate_statistics_report,
+    dedupe_mask, filter_mask, iter_file_chunks, load_data, null_fill_value, parallel_corr, parallel_value_counts,
+    read_csv_parallel, statistics_report, write_columnar, write_csv_parallel, write_excel, write_sqlite
+)
+
+SHAPES = {"tall": (4, 3), "wide": (60, 40)}  # (numeric columns, text columns)
+CARDINALITY = {"low": 20, "high": None}  # Distinct values per column; None means close to unique
+DUPLICATE_RATIO = 0.05
+NOISE_FLOOR_S = 0.01  # Comparisons ignore benchmarks faster than this
+
+def parse_size(text):
+    """('rows', n) for '100k' / '2M', ('bytes', n) for '500MB' / '4GB'"""
+    match = re.fullmatch(r"(\d+(?:\.\d+)?)\s*([kmg]?)(b?)", text.strip().lower())
+    if not match:
+        raise ValueError(f"Cannot read size '{text}'; use rows like 100k or bytes like 500MB")
+    number, unit, in_bytes = float(match.group(1)), match.group(2), match.group(3)
+    if in_bytes:
+        return "bytes", int(number * 1024 ** " kmg".index(unit or " "))
+    return "rows", int(number * 1000 ** " kmg".index(unit or " "))
+
+def synthetic_chunk(rng, rows, shape, cardinality, null_ratio):
+    """One chunk of mixed numeric and text columns with nulls and repeated rows"""
+    numeric, text = SHAPES[shape]
+    distinct = CARDINALITY[cardinality]
+    data = {}
+    for i in range(numeric):
+        if distinct is not None:
+            values = rng.integers(0, distinct, rows).astype(np.float64)
+        elif i % 2:
+            values = rng.integers(-10**9, 10**9, rows).astype(np.float64)
+        else:
+            values = rng.normal(0.0, 100.0, rows)
+        values[rng.random(rows) < null_ratio] = np.nan
+        data[f"n{i}"] = values
+    for i in range(text):
+        codes = rng.integers(0, distinct or 10**12, rows)
+        values = pd.Series(codes).map("k{}".format).to_numpy(dtype=object)
+        values[rng.random(rows) < null_ratio] = None
+        data[f"s{i}"] = values
+    chunk = pd.DataFrame(data)
+    # Copy a share of rows so duplicate removal has work to do
+    order = np.arange(rows)
+    repeated = rng.random(rows) < DUPLICATE_RATIO
+    order[repeated] = rng.integers(0, rows, int(repeated.sum()))
+    return chunk.iloc[order]
+
+def generate_csv(file_path, size, shape, cardinality, null_ratio, seed=0, chunk_rows=200000):
+    """Write a synthetic CSV of the requested size chunk by chunk; returns the row count"""
+    kind, target = size
+    rng = np.random.default_rng(seed)
+    rows = 0
+    bytes_per_row = None
+    with open(file_path, 'w', newline='', encoding='utf-8') as handle:
+        while True:
+            if kind == "rows":
+                count = min(chunk_rows, target - rows)
+            else:
+                left = target - handle.tell()
+                count = chunk_rows if bytes_per_row is None else min(chunk_rows, math.ceil(left / bytes_per_row))
+            if count <= 0:
+                break
+            chunk = synthetic_chunk(rng, count, shape, cardinality, null_ratio)
+            chunk.to_csv(handle, header=rows == 0, index=False)
+            rows += count
+            bytes_per_row = handle.tell() / rows
+    return rows
+
+def convert_formats(csv_path, data_dir, rows, excel_max_cells, convert_max_rows):
+    """Write the other input formats from the CSV; returns {file type: path}"""
+    paths = {"CSV": csv_path}
+    if rows > convert_max_rows:
+        return paths
+    df = pd.read_csv(csv_path)
+    stem = os.path.splitext(csv_path)[0]
+    df.to_json(stem + ".json", orient="records")
+    paths["JSON"] = stem + ".json"
+    df.to_json(stem + ".jsonl", orient="records", lines=True)
+    paths["JSON Lines"] = stem + ".jsonl"
+    write_sqlite(df, stem + ".db", "data")
+    paths["SQLite"] = stem + ".db"
+    write_columnar(df, stem + ".dpc")
+    paths["Columnar"] = stem + ".dpc"
+    if rows * len(df.columns) <= excel_max_cells:  # openpyxl reads about 100k cells per second
+        write_excel(df, stem + ".xlsx")
+        paths["Excel"] = stem + ".xlsx"
+    return paths
+
+def measure(func, repeat=1, memory=True):
+    """Best wall and CPU time over repeat runs, plus the traced peak of one extra run.
+
+    Tracing slows allocation-heavy code, so the timed runs are not traced.
+    Work done in worker processes is not part of the CPU time or the peak.
+    """
+    wall = cpu = None
+    result = None
+    for _ in range(repeat):
+        result = None
+        gc.collect()
+        start, cpu_start = time.perf_counter(), time.process_time()
+        result = func()
+        elapsed, cpu_elapsed = time.perf_counter() - start, time.process_time() - cpu_start
+        if wall is None or elapsed < wall:
+            wall, cpu = elapsed, cpu_elapsed
+    rows_out = len(result) if isinstance(result, pd.DataFrame) else None
+    result = None
+    peak = None
+    if memory:
+        gc.collect()
+        tracemalloc.start()
+        try:
+            func()
+        finally:
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+    return wall, cpu, peak, rows_out
+
+def load_benchmarks(paths, chunk_size, workers, scratch_dir):
+    """Every load path the GUI's load thread can take, by name"""
+    csv_path = paths["CSV"]
+    benchmarks = {
+        "load/CSV": lambda: load_data(csv_path, "CSV", chunk_size)[0],
+        "load/CSV parallel": lambda: read_csv_parallel(csv_path, workers),
+        "load/CSV compact": lambda: load_data(csv_path, "CSV", chunk_size, compact_mode=True)[0],
+        "load/CSV streaming scan": lambda: sum(len(chunk) for chunk in iter_file_chunks(csv_path, "CSV", chunk_size)),
+    }
+    cache = LoadCache(os.path.join(scratch_dir, "load_cache"))
+    load_data(csv_path, "CSV", chunk_size, cache=cache)  # Warm the cache so the benchmark times a hit
+    benchmarks["load/CSV cached"] = lambda: load_data(csv_path, "CSV", chunk_size, cache=cache)[0]
+    for file_type, path in paths.items():
+        if file_type != "CSV":
+            benchmarks[f"load/{file_type}"] = \
+                lambda path=path, file_type=file_type: load_data(path, file_type, chunk_size, workers=workers)[0]
+    return benchmarks
+
+def operation_benchmarks(df, workers, executor, scratch_dir):
+    """The core calls behind each fast_* operation and export, by name.
+
+    Each call works on a shallow copy with an undo journal, as the GUI's
+    data jobs do.
+    """
+    numeric_df = df.select_dtypes(include='number')
+    condition = "n0 > 0"
+
+    def with_journal(step):
+        return lambda: step(df.copy(deep=False), OperationJournal())
+
+    def output(name):
+        path = os.path.join(scratch_dir, name)
+        if os.path.isdir(path):
+            shutil.rmtree(path)
+        elif os.path.exists(path):
+            os.remove(path)
+        return path
+
+    benchmarks = {
+        "fast_drop_na": with_journal(
+            lambda frame, journal: journal.remove_rows(frame, frame.notna().all(axis=1).to_numpy(), "Drop null rows")
+        ),
+        "fast_remove_duplicates": with_journal(
+            lambda frame, journal: journal.remove_rows(frame, dedupe_mask(frame), "Dedupe")
+        ),
+        "fast_remove_duplicates keys": with_journal(
+            lambda frame, journal: journal.remove_rows(frame, dedupe_mask(frame, ["s0", "n1"], "last"), "Dedupe")
+        ),
+        "fast_apply_filter": with_journal(
+            lambda frame, journal: journal.remove_rows(frame, filter_mask(frame, condition), condition)
+        ),
+        "fast_fill_null_values numeric": with_journal(
+            lambda frame, journal: journal.fill_nulls(frame, "n1", null_fill_value(frame["n1"]), "Fill")
+        ),
+        "fast_fill_null_values text": with_journal(
+            lambda frame, journal: journal.fill_nulls(frame, "s0", null_fill_value(frame["s0"]), "Fill")
+        ),
+        "lazy pipeline": with_journal(lambda frame, journal: apply_steps(frame, [
+            {"op": "filter", "condition": condition}, {"op": "dropna"}, {"op": "dedupe"},
+        ], journal)),
+        "fast_show_statistics": lambda: statistics_report(df, ColumnStats(), executor),
+        "fast_show_statistics approximate": lambda: approximate_statistics_report(
+            DatasetSketch(0.01).update(df, executor), df
+        ),
+        "fast_show_correlation": lambda: parallel_corr(numeric_df, executor),
+        "fast_plot_column": lambda: parallel_value_counts(df["s0"], executor, workers),
+        "export/CSV": lambda: write_csv_parallel(df, output("out.csv"), workers),
+        "export/CSV gzip": lambda: write_csv_parallel(df, output("out.csv.gz"), workers),
+        "export/SQLite": lambda: write_sqlite(df, output("out.db"), "data"),
+        "export/Columnar": lambda: write_columnar(df.reset_index(drop=True), output("out.dpc")),
+    }
+    return benchmarks
+
+def environment(args):
+    try:
+        revision = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)), timeout=10
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        revision = None
+    return {
+        "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+        "revision": revision,
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "workers": args.workers,
+        "repeat": args.repeat,
+    }
+
+def run_suite(args, report=print):
+    """Generate every requested dataset and run all benchmarks on it; returns the result rows"""
+    data_dir = args.data_dir or tempfile.mkdtemp(prefix="adp_bench_")
+    os.makedirs(data_dir, exist_ok=True)
+    results = []
+    executor = ThreadPoolExecutor(max_workers=args.workers)
+    try:
+        for size_text in args.sizes.split(","):
+            size = parse_size(size_text)
+            for shape in args.shapes.split(","):
+                for cardinality in args.cardinality.split(","):
+                    for null_ratio in (float(value) for value in args.nulls.split(",")):
+                        dataset = f"{shape}-{cardinality}-nulls{null_ratio:g}-{size_text.strip()}"
+                        dataset_dir = os.path.join(data_dir, dataset)
+                        os.makedirs(dataset_dir, exist_ok=True)
+                        csv_path = os.path.join(dataset_dir, "data.csv")
+                        rows = generate_csv(csv_path, size, shape, cardinality, null_ratio, args.seed)
+                        paths = convert_formats(csv_path, dataset_dir, rows, args.excel_max_cells,
+                                                args.convert_max_rows)
+                        info = {
+                            "dataset": dataset, "shape": shape, "cardinality": cardinality,
+                            "null_ratio": null_ratio, "rows": rows, "columns": sum(SHAPES[shape]),
+                            "csv_mb": os.path.getsize(csv_path) / (1024 * 1024),
+                        }
+                        benchmarks = load_benchmarks(paths, args.chunk_size, args.workers, dataset_dir)
+                        df = None
+                        if not args.load_only:
+                            df = load_data(csv_path, "CSV", args.chunk_size)[0]
+                            benchmarks.update(operation_benchmarks(df, args.workers, executor, dataset_dir))
+                        for name, func in benchmarks.items():
+                            if args.only and not re.search(args.only, name):
+                                continue
+                            wall, cpu, peak, rows_out = measure(func, args.repeat, not args.no_memory)
+                            result = dict(info, benchmark=name, wall_s=wall, cpu_s=cpu,
+                                          peak_mb=None if peak is None else peak / (1024 * 1024),
+                                          rows_per_s=rows / wall if wall else None, rows_out=rows_out)
+                            results.append(result)
+                            report(format_result(result))
+                        df = None
+                        if not args.keep_data:
+                            shutil.rmtree(dataset_dir, ignore_errors=True)
+    finally:
+        executor.shutdown()
+        if not args.keep_data and not args.data_dir:
+            shutil.rmtree(data_dir, ignore_errors=True)
+    return results
+
+def format_result(result):
+    peak = "-" if result["peak_mb"] is None else f"{result['peak_mb']:.1f} MB"
+    return (f"{result['dataset']:<28} {result['benchmark']:<34} {result['wall_s']:9.3f}s "
+            f"{result['rows_per_s'] or 0:>14,.0f} rows/s {peak:>12}")
+
+def compare_results(results, baseline, threshold):
+    """Print wall-time changes against a baseline run; returns the regressed benchmarks"""
+    previous = {(row["dataset"], row["benchmark"]): row for row in baseline["results"]}
+    regressions = []
+    print(f"\nCompared with {baseline['meta'].get('revision') or 'baseline'} "
+          f"({baseline['meta'].get('timestamp', '?')}):")
+    for row in results:
+        old = previous.get((row["dataset"], row["benchmark"]))
+        if old is None or not old["wall_s"]:
+            continue
+        ratio = row["wall_s"] / old["wall_s"]
+        flag = ""
+        if ratio > 1 + threshold and row["wall_s"] >= NOISE_FLOOR_S:
+            flag = "  ❌ slower"
+            regressions.append(row)
+        elif ratio < 1 - threshold and old["wall_s"] >= NOISE_FLOOR_S:
+            flag = "  ✅ faster"
+        print(f"   {row['dataset']:<28} {row['benchmark']:<34} {old['wall_s']:9.3f}s → {row['wall_s']:9.3f}s "
+              f"({ratio:5.2f}x){flag}")
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the load paths, fast_* operations and exports")
+    parser.add_argument("--sizes", default="100k", help="Comma separated rows (100k, 2M) or CSV sizes (500MB, 4GB)")
+    parser.add_argument("--shapes", default="tall,wide", help=f"Comma separated: {', '.join(SHAPES)}")
+    parser.add_argument("--cardinality", default="low,high", help=f"Comma separated: {', '.join(CARDINALITY)}")
+    parser.add_argument("--nulls", default="0.1", help="Comma separated null ratios, e.g. 0,0.1,0.5")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--chunk-size", type=int, default=50000)
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per benchmark; the best is kept")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--only", help="Run only benchmarks whose name matches this regular expression")
+    parser.add_argument("--load-only", action="store_true", help="Skip operations and exports")
+    parser.add_argument("--no-memory", action="store_true", help="Skip the traced run that measures peak memory")
+    parser.add_argument("--excel-max-cells", type=int, default=1000000,
+                        help="Largest dataset (rows x columns) converted to Excel")
+    parser.add_argument("--convert-max-rows", type=int, default=2000000,
+                        help="Largest dataset converted to formats other than CSV")
+    parser.add_argument("--data-dir", help="Where to generate data (default: a temporary folder)")
+    parser.add_argument("--keep-data", action="store_true", help="Keep the generated files")
+    parser.add_argument("--output", default="benchmark_results.json", help="JSON results file")
+    parser.add_argument("--compare", help="Earlier results file to compare wall times against")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="Relative slowdown counted as a regression (default: 0.2)")
+    args = parser.parse_args(argv)
+    for values, known in ((args.shapes, SHAPES), (args.cardinality, CARDINALITY)):
+        unknown = [value for value in values.split(",") if value not in known]
+        if unknown:
+            parser.error(f"unknown value '{unknown[0]}'")
+
+    meta = environment(args)
+    print(f"Benchmarking {meta['revision'] or 'working tree'} on {meta['cpu_count']} CPUs, "
+          f"{args.workers} workers, best of {args.repeat}")
+    results = run_suite(args)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump({"meta": meta, "results": results}, f, indent=2)
+    print(f"\n{len(results)} results written to {args.output}")
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare_results(results, baseline, args.threshold)
+        if regressions:
+            print(f"\n❌ {len(regressions)} benchmarks more than {args.threshold:.0%} slower")
+            return 1
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
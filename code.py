@@ -1,20 +1,179 @@
 import sys
-import pandas as pd
-import sqlite3
-import matplotlib.pyplot as plt
-import numpy as np
+import time
+STARTUP_STARTED = time.perf_counter()  # Reference point for the startup report
 from PyQt5.QtWidgets import (
     QApplication, QWidget, QVBoxLayout, QPushButton, QFileDialog,
-    QLabel, QTableWidget, QTableWidgetItem, QMessageBox, QLineEdit, QComboBox,
+    QLabel, QTableView, QHeaderView, QMessageBox, QLineEdit, QComboBox,
     QHBoxLayout, QGroupBox, QTextEdit, QSplitter, QTabWidget, QProgressBar,
-    QCheckBox, QSpinBox
+    QCheckBox, QSpinBox, QDoubleSpinBox, QInputDialog, QDialog, QDialogButtonBox,
+    QListWidget, QListWidgetItem
 )
-from PyQt5.QtCore import Qt, QThread, pyqtSignal, QTimer
+from PyQt5.QtCore import Qt, QThread, pyqtSignal, QTimer, QAbstractTableModel, QModelIndex
 from PyQt5.QtGui import QFont
 import gc
 import os
+import importlib
+import contextlib
+from collections import deque
 from concurrent.futures import ThreadPoolExecutor
 import threading
+from processor import (
+    LOAD_CACHE_DIR, LOAD_CACHE_LIMIT_MB,
+    ColumnStats, DatasetSketch, Job, JobCancelled, LazyPlan, LoadCache, OperationJournal, PerformanceTrace,
+    StreamingPipeline, approximate_statistics_report, connect_sqlite_readonly, csv_compression, dedupe_mask,
+    excel_sheet_names, filter_mask, iter_file_chunks, load_data, null_fill_value, parallel_corr, parallel_value_counts,
+    path_size, sqlite_columns, sqlite_tables, statistics_report, write_columnar, write_csv_parallel, write_excel,
+    write_sqlite
+)
+STARTUP_IMPORTED = time.perf_counter()
+
+STARTUP_BUDGET_MS = 1500  # Time to an interactive window; --startup-report fails above it
+DEFERRED_MODULES = ("pandas", "numpy", "matplotlib", "openpyxl", "sqlite3")
+
+class StartupTimer:
+    """Milestones from the moment code.py starts loading, for the startup report"""
+
+    def __init__(self):
+        self.marks = [("Imports (PyQt5 + core)", STARTUP_STARTED, STARTUP_IMPORTED)]
+        self.loaded_before_window = []
+
+    def mark(self, label, since):
+        self.marks.append((label, since, time.perf_counter()))
+
+    def interactive_ms(self):
+        return next(((end - STARTUP_STARTED) * 1000 for label, _, end in self.marks if label == "Window shown"), None)
+
+    def report(self):
+        stats_text = "⏱️ STARTUP TIMING\n" + "="*50 + "\n\n"
+        for label, start, end in sorted(self.marks, key=lambda mark: mark[2]):
+            stats_text += (f"   • {label:<32} {(end - start) * 1000:8.1f} ms"
+                           f"   (at {(end - STARTUP_STARTED) * 1000:.1f} ms)\n")
+        interactive = self.interactive_ms()
+        if interactive is not None:
+            verdict = "within" if interactive <= STARTUP_BUDGET_MS else "OVER"
+            stats_text += f"\n🎯 Interactive window: {interactive:.1f} ms ({verdict} the {STARTUP_BUDGET_MS} ms budget)\n"
+        stats_text += "📦 Imported before the window: " + (", ".join(self.loaded_before_window) or "none of " +
+                                                         ", ".join(DEFERRED_MODULES)) + "\n"
+        return stats_text
+
+def warm_up(timer):
+    """Import numpy and pandas off the UI thread so the first load does not pay for them"""
+    for name in ("numpy", "pandas"):
+        start = time.perf_counter()
+        importlib.import_module(name)
+        timer.mark(f"{name} import (background)", start)
+
+class DataFrameTableModel(QAbstractTableModel):
+    """Read-only table model that formats only the cells the view asks for"""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._df = None
+
+    def set_frame(self, df):
+        """Point the model at a new frame; no cells are formatted up front"""
+        self.beginResetModel()
+        self._df = df
+        self.endResetModel()
+
+    def rowCount(self, parent=QModelIndex()):
+        if self._df is None or parent.isValid():
+            return 0
+        return len(self._df)
+
+    def columnCount(self, parent=QModelIndex()):
+        if self._df is None or parent.isValid():
+            return 0
+        return len(self._df.columns)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole or not index.isValid():
+            return None
+        return str(self._df.iat[index.row(), index.column()])
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole or self._df is None:
+            return None
+        if orientation == Qt.Horizontal:
+            return str(self._df.columns[section])
+        return str(self._df.index[section])
+
+class JobScheduler(QThread):
+    """Runs jobs one at a time on a background thread, in the order they were submitted.
+
+    Because jobs never overlap, each one sees the data exactly as the jobs
+    queued before it left it. A failing job with stop_queue_on_error cancels
+    everything queued behind it, since those jobs expected its result.
+    """
+    job_started = pyqtSignal(object)
+    job_progress = pyqtSignal(object, int)
+    job_finished = pyqtSignal(object, object)
+    job_failed = pyqtSignal(object, str)
+    job_cancelled = pyqtSignal(object)
+
+    def __init__(self, trace=None):
+        super().__init__()
+        self.trace = trace
+        self.pending = deque()
+        self.current = None
+        self._condition = threading.Condition()
+        self._stopping = False
+
+    def submit(self, job):
+        job.report = lambda value: self.job_progress.emit(job, value)
+        with self._condition:
+            self.pending.append(job)
+            self._condition.notify()
+
+    def busy(self):
+        with self._condition:
+            return self.current is not None or bool(self.pending)
+
+    def cancel_all(self):
+        """Cancel the running job and everything queued"""
+        with self._condition:
+            for job in self.pending:
+                job.cancel()
+            if self.current is not None:
+                self.current.cancel()
+
+    def shutdown(self):
+        self.cancel_all()
+        with self._condition:
+            self._stopping = True
+            self._condition.notify()
+        self.wait()
+
+    def run(self):
+        while True:
+            with self._condition:
+                while not self.pending and not self._stopping:
+                    self._condition.wait()
+                if self._stopping:
+                    return
+                job = self.current = self.pending.popleft()
+            outcome = None
+            try:
+                job.check()
+                job.started_at = time.perf_counter()
+                self.job_started.emit(job)
+                span = self.trace.span(job.name, job.category) if self.trace is not None \
+                    else contextlib.nullcontext({})
+                with span as job.metrics:
+                    result = job.func(job)
+                outcome = (self.job_finished, job, result)
+            except JobCancelled:
+                outcome = (self.job_cancelled, job)
+            except Exception as e:
+                if job.stop_queue_on_error:
+                    with self._condition:
+                        for queued in self.pending:
+                            queued.cancel()
+                outcome = (self.job_failed, job, str(e))
+            finally:
+                with self._condition:
+                    self.current = None
+            outcome[0].emit(*outcome[1:])
 
 class FastDataLoadThread(QThread):
     """Optimized thread for loading large files with parallel processing"""
@@ -22,63 +181,62 @@ class FastDataLoadThread(QThread):
     finished = pyqtSignal(object, str)
     error = pyqtSignal(str)
     
-    def __init__(self, file_path, file_type, chunk_size=50000):
+    def __init__(self, file_path, file_type, chunk_size=50000, compact_mode=False, use_cache=False,
+                 streaming=False, sketch_error=None, workers=1, source_options=None, trace=None):
         super().__init__()
+        self.trace = trace
+        self.workers = workers
+        self.source_options = source_options
         self.file_path = file_path
         self.file_type = file_type
         self.chunk_size = chunk_size
+        self.compact_mode = compact_mode
+        self.streaming = streaming
+        self.sketch_error = sketch_error
+        self.sketch = None
+        self.memory_saved = 0
+        # A columnar store is already on disk in its cached form
+        self.cache = LoadCache() if use_cache and not streaming and file_type != "Columnar" else None
         
     def run(self):
         try:
-            if self.file_type == "CSV":
-                # Optimized CSV loading with parallel processing
-                file_size = os.path.getsize(self.file_path) / (1024 * 1024)  # MB
-                
-                if file_size > 50:  # Lower threshold for faster processing
-                    # Fast chunked loading with optimized parameters
-                    chunks = []
-                    total_rows = 0
-                    
-                    # Fast row counting
-                    for chunk in pd.read_csv(self.file_path, chunksize=self.chunk_size, nrows=1000000):
-                        total_rows += len(chunk)
-                        if total_rows > 1000000:  # Limit for very large files
-                            break
-                    
-                    # Optimized loading with better memory management
-                    for chunk in pd.read_csv(self.file_path, chunksize=self.chunk_size):
-                        chunks.append(chunk)
-                        if len(chunks) % 10 == 0:  # Update progress less frequently
-                            progress = int((len(chunks) * self.chunk_size / total_rows) * 100)
-                            self.progress.emit(min(progress, 99))
-                    
-                    df = pd.concat(chunks, ignore_index=True, copy=False)
-                    self.progress.emit(100)
-                    self.finished.emit(df, f"Fast load: {len(df):,} rows, {len(df.columns)} columns")
-                else:
-                    # Direct loading for smaller files
-                    df = pd.read_csv(self.file_path, engine='c')  # Use C engine for speed
-                    self.finished.emit(df, f"Fast load: {len(df):,} rows and {len(df.columns)} columns")
-                    
-            elif self.file_type == "Excel":
-                df = pd.read_excel(self.file_path, engine='openpyxl')
-                self.finished.emit(df, f"Fast load: {len(df):,} rows and {len(df.columns)} columns")
-                
-            elif self.file_type == "JSON":
-                df = pd.read_json(self.file_path)
-                self.finished.emit(df, f"Fast load: {len(df):,} rows and {len(df.columns)} columns")
-                
-            elif self.file_type == "SQLite":
-                conn = sqlite3.connect(self.file_path)
-                tables = pd.read_sql_query("SELECT name FROM sqlite_master WHERE type='table';", conn)
-                table_name = tables.iloc[0, 0]
-                df = pd.read_sql_query(f"SELECT * FROM {table_name}", conn)
-                conn.close()
-                self.finished.emit(df, f"Fast load: {len(df):,} rows and {len(df.columns)} columns")
-                
+            name = f"Load {os.path.basename(os.path.normpath(self.file_path))}"
+            span = self.trace.span(name, "load", file_type=self.file_type) if self.trace is not None \
+                else contextlib.nullcontext({})
+            with span as metrics:
+                df, message = self.load(metrics)
+            self.finished.emit(df, message)
         except Exception as e:
             self.error.emit(str(e))
 
+    def load(self, metrics):
+        if self.streaming:
+            # Only the first chunk is loaded; the full file is streamed on export
+            chunks = iter_file_chunks(
+                self.file_path, self.file_type, self.chunk_size, self.progress.emit, self.source_options
+            )
+            df = next(chunks, None)
+            if self.sketch_error is not None and df is not None:
+                # Sketch the whole file in the same pass so full-file stats are ready
+                self.sketch = DatasetSketch(self.sketch_error).update(df)
+                for chunk in chunks:
+                    self.sketch.update(chunk)
+                metrics["bytes_read"] = path_size(self.file_path)
+            chunks.close()
+            if df is None:
+                raise ValueError("File contains no rows")
+            metrics["rows_out"] = len(df)
+            self.progress.emit(100)
+            return df, f"Streaming preview: first {len(df):,} rows and {len(df.columns)} columns"
+
+        df, message, self.memory_saved = load_data(
+            self.file_path, self.file_type, self.chunk_size, self.compact_mode, self.cache,
+            self.workers, self.source_options, self.progress.emit, metrics
+        )
+        if self.sketch_error is not None:
+            self.sketch = DatasetSketch(self.sketch_error).update(df)
+        return df, message
+
 class FastDataProcessorApp(QWidget):
     def __init__(self):
         super().__init__()
@@ -86,11 +244,26 @@ class FastDataProcessorApp(QWidget):
         self.resize(1200, 800)
 
         self.df = None
-        self.original_df = None
+        self.column_stats = ColumnStats()
+        self.sketch = None
+        self.journal = OperationJournal(self.on_data_changed)
+        self.lazy_plan = LazyPlan()
+        self.stream_source = None
         self.load_thread = None
         self.cached_stats = None
-        self.display_cache = None
-        self.executor = ThreadPoolExecutor(max_workers=4)
+        self.memory_saved = 0
+        self.executor = ThreadPoolExecutor(max_workers=os.cpu_count() or 4)
+        self.trace = PerformanceTrace()
+        self.scheduler = JobScheduler(self.trace)
+        self.scheduler.job_started.connect(self.on_job_started)
+        self.scheduler.job_progress.connect(self.on_job_progress)
+        self.scheduler.job_finished.connect(self.on_job_finished)
+        self.scheduler.job_failed.connect(self.on_job_failed)
+        self.scheduler.job_cancelled.connect(self.on_job_cancelled)
+        self.scheduler.start()
+        self.job_timer = QTimer(self)
+        self.job_timer.setInterval(200)
+        self.job_timer.timeout.connect(self.update_job_status)
 
         # Create main layout
         main_layout = QHBoxLayout()
@@ -103,12 +276,12 @@ class FastDataProcessorApp(QWidget):
         file_group = QGroupBox("📁 File Operations")
         file_layout = QVBoxLayout()
         
-        self.label = QLabel("Upload a CSV, Excel, JSON, or SQLite DB file")
+        self.label = QLabel("Upload a CSV, Excel, JSON, SQLite DB file or columnar store")
         self.label.setFont(QFont("Arial", 10, QFont.Bold))
         file_layout.addWidget(self.label)
 
         self.filetype_dropdown = QComboBox()
-        self.filetype_dropdown.addItems(["CSV", "Excel", "JSON", "SQLite"])
+        self.filetype_dropdown.addItems(["CSV", "Excel", "JSON", "JSON Lines", "SQLite", "Columnar"])
         file_layout.addWidget(self.filetype_dropdown)
 
         # Optimized chunk size for speed
@@ -121,6 +294,24 @@ class FastDataProcessorApp(QWidget):
         chunk_layout.addWidget(self.chunk_size_spin)
         file_layout.addLayout(chunk_layout)
 
+        self.compact_checkbox = QCheckBox("Compact memory mode")
+        self.compact_checkbox.setToolTip("Downcast numbers and store repeated text as categories")
+        file_layout.addWidget(self.compact_checkbox)
+
+        self.cache_checkbox = QCheckBox("Cache parsed files")
+        self.cache_checkbox.setChecked(False)
+        self.cache_checkbox.setToolTip(
+            f"Reopen unchanged files from a columnar copy kept in {LOAD_CACHE_DIR} (up to {LOAD_CACHE_LIMIT_MB} MB) "
+            "instead of re-parsing"
+        )
+        file_layout.addWidget(self.cache_checkbox)
+
+        self.streaming_checkbox = QCheckBox("Streaming mode (larger than RAM)")
+        self.streaming_checkbox.setToolTip(
+            "Preview the first chunk and stream the whole file through queued steps on export"
+        )
+        file_layout.addWidget(self.streaming_checkbox)
+
         self.load_button = QPushButton("🚀 Load File")
         self.load_button.clicked.connect(self.load_file)
         self.load_button.setStyleSheet("QPushButton { background-color: #4CAF50; color: white; padding: 8px; }")
@@ -130,6 +321,19 @@ class FastDataProcessorApp(QWidget):
         self.progress_bar = QProgressBar()
         self.progress_bar.setVisible(False)
         file_layout.addWidget(self.progress_bar)
+
+        # Background job status
+        job_layout = QHBoxLayout()
+        self.job_label = QLabel("")
+        self.job_label.setWordWrap(True)
+        job_layout.addWidget(self.job_label)
+        self.cancel_button = QPushButton("✖ Cancel")
+        self.cancel_button.setToolTip("Cancel the running job and all queued jobs")
+        self.cancel_button.clicked.connect(self.cancel_jobs)
+        self.cancel_button.setVisible(False)
+        self.cancel_button.setStyleSheet("QPushButton { background-color: #F44336; color: white; padding: 4px; }")
+        job_layout.addWidget(self.cancel_button)
+        file_layout.addLayout(job_layout)
         
         file_group.setLayout(file_layout)
         left_layout.addWidget(file_group)
@@ -150,6 +354,36 @@ class FastDataProcessorApp(QWidget):
         self.duplicates_button.setStyleSheet("QPushButton { background-color: #FF9800; color: white; padding: 8px; }")
         clean_layout.addWidget(self.duplicates_button)
 
+        self.lazy_checkbox = QCheckBox("Lazy pipeline mode")
+        self.lazy_checkbox.setToolTip("Queue cleaning steps and run them in one fused pass when results are needed")
+        self.lazy_checkbox.toggled.connect(self.on_lazy_mode_toggled)
+        clean_layout.addWidget(self.lazy_checkbox)
+
+        self.pipeline_label = QLabel("")
+        self.pipeline_label.setWordWrap(True)
+        self.pipeline_label.setVisible(False)
+        clean_layout.addWidget(self.pipeline_label)
+
+        self.run_pipeline_button = QPushButton("▶ Run Pipeline")
+        self.run_pipeline_button.clicked.connect(self.run_pipeline)
+        self.run_pipeline_button.setVisible(False)
+        self.run_pipeline_button.setStyleSheet("QPushButton { background-color: #FF9800; color: white; padding: 8px; }")
+        clean_layout.addWidget(self.run_pipeline_button)
+
+        history_layout = QHBoxLayout()
+        self.undo_button = QPushButton("↶ Undo")
+        self.undo_button.clicked.connect(self.undo_step)
+        self.undo_button.setEnabled(False)
+        self.undo_button.setStyleSheet("QPushButton { background-color: #9E9E9E; color: white; padding: 8px; }")
+        history_layout.addWidget(self.undo_button)
+
+        self.redo_button = QPushButton("↷ Redo")
+        self.redo_button.clicked.connect(self.redo_step)
+        self.redo_button.setEnabled(False)
+        self.redo_button.setStyleSheet("QPushButton { background-color: #9E9E9E; color: white; padding: 8px; }")
+        history_layout.addWidget(self.redo_button)
+        clean_layout.addLayout(history_layout)
+
         self.reset_button = QPushButton("↺ Reset to Original")
         self.reset_button.clicked.connect(self.reset_data)
         self.reset_button.setEnabled(False)
@@ -215,6 +449,32 @@ class FastDataProcessorApp(QWidget):
         self.plot_button.setStyleSheet("QPushButton { background-color: #607D8B; color: white; padding: 8px; }")
         analysis_layout.addWidget(self.plot_button)
 
+        workers_layout = QHBoxLayout()
+        workers_layout.addWidget(QLabel("Workers:"))
+        self.workers_spin = QSpinBox()
+        self.workers_spin.setRange(1, max(64, os.cpu_count() or 4))
+        self.workers_spin.setValue(os.cpu_count() or 4)
+        self.workers_spin.setToolTip("Workers used to parse large CSV files and analyze columns in parallel")
+        self.workers_spin.valueChanged.connect(self.on_workers_changed)
+        workers_layout.addWidget(self.workers_spin)
+        analysis_layout.addLayout(workers_layout)
+
+        approx_layout = QHBoxLayout()
+        self.approx_checkbox = QCheckBox("Approximate")
+        self.approx_checkbox.setToolTip(
+            "Use HyperLogLog, quantile and heavy-hitter sketches for distinct counts, quartiles, modes and top values"
+        )
+        self.approx_checkbox.toggled.connect(self.on_approximate_settings_changed)
+        approx_layout.addWidget(self.approx_checkbox)
+        self.approx_error_spin = QDoubleSpinBox()
+        self.approx_error_spin.setRange(0.1, 10.0)
+        self.approx_error_spin.setSingleStep(0.1)
+        self.approx_error_spin.setValue(1.0)
+        self.approx_error_spin.setSuffix(" % error")
+        self.approx_error_spin.valueChanged.connect(self.on_approximate_settings_changed)
+        approx_layout.addWidget(self.approx_error_spin)
+        analysis_layout.addLayout(approx_layout)
+
         self.correlation_button = QPushButton("🔗 Correlation Matrix")
         self.correlation_button.clicked.connect(self.fast_show_correlation)
         self.correlation_button.setEnabled(False)
@@ -249,13 +509,43 @@ class FastDataProcessorApp(QWidget):
         self.tab_widget = QTabWidget()
         
         # Data table tab
-        self.table = QTableWidget()
+        self.table_model = DataFrameTableModel(self)
+        self.table = QTableView()
+        self.table.setModel(self.table_model)
+        # Fixed row heights keep scrolling constant-time on very long frames
+        self.table.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
+        self.table.verticalHeader().setDefaultSectionSize(24)
         self.tab_widget.addTab(self.table, "📋 Data Table")
         
         # Statistics tab
         self.stats_text = QTextEdit()
         self.stats_text.setReadOnly(True)
         self.tab_widget.addTab(self.stats_text, "📊 Statistics")
+
+        # Performance tab: one row per load, cleaning, analysis and export operation
+        performance_panel = QWidget()
+        performance_layout = QVBoxLayout()
+        performance_controls = QHBoxLayout()
+        self.performance_label = QLabel("No operations yet")
+        performance_controls.addWidget(self.performance_label, 1)
+        self.trace_memory_checkbox = QCheckBox("Trace memory (slower)")
+        self.trace_memory_checkbox.setToolTip("Measure the peak Python allocation of each operation with tracemalloc")
+        self.trace_memory_checkbox.toggled.connect(self.trace.set_trace_memory)
+        performance_controls.addWidget(self.trace_memory_checkbox)
+        export_trace_button = QPushButton("💾 Export Trace")
+        export_trace_button.clicked.connect(self.export_trace)
+        performance_controls.addWidget(export_trace_button)
+        clear_trace_button = QPushButton("Clear")
+        clear_trace_button.clicked.connect(self.clear_trace)
+        performance_controls.addWidget(clear_trace_button)
+        performance_layout.addLayout(performance_controls)
+        self.performance_model = DataFrameTableModel(self)
+        self.performance_table = QTableView()
+        self.performance_table.setModel(self.performance_model)
+        self.performance_table.verticalHeader().setVisible(False)
+        performance_layout.addWidget(self.performance_table)
+        performance_panel.setLayout(performance_layout)
+        self.tab_widget.addTab(performance_panel, "⏱️ Performance")
         
         right_layout.addWidget(self.tab_widget)
         right_panel.setLayout(right_layout)
@@ -264,41 +554,156 @@ class FastDataProcessorApp(QWidget):
         self.setLayout(main_layout)
 
     def load_file(self):
+        if self.scheduler.busy():
+            # Queued jobs expect the current data; replacing it under them is not safe
+            QMessageBox.warning(self, "Busy", "Wait for the running jobs to finish or cancel them before loading a file")
+            return
         file_type = self.filetype_dropdown.currentText()
-        file_filter = {
-            "CSV": "CSV Files (*.csv)",
-            "Excel": "Excel Files (*.xlsx *.xls)",
-            "JSON": "JSON Files (*.json)",
-            "SQLite": "SQLite DB Files (*.db *.sqlite *.sqlite3)"
-        }[file_type]
+        if file_type == "Columnar":
+            # A columnar store is a directory of per-column files
+            file_path = QFileDialog.getExistingDirectory(self, "Open Columnar Store", "")
+            if file_path and not os.path.exists(os.path.join(file_path, "meta.json")):
+                QMessageBox.warning(self, "Warning", "The selected folder is not a columnar store")
+                return
+        else:
+            file_filter = {
+                "CSV": "CSV Files (*.csv)",
+                "Excel": "Excel Files (*.xlsx *.xls)",
+                "JSON": "JSON Files (*.json)",
+                "JSON Lines": "JSON Lines Files (*.jsonl *.ndjson *.json)",
+                "SQLite": "SQLite DB Files (*.db *.sqlite *.sqlite3)"
+            }[file_type]
+            file_path, _ = QFileDialog.getOpenFileName(self, "Open File", "", file_filter)
 
-        file_path, _ = QFileDialog.getOpenFileName(self, "Open File", "", file_filter)
+        source_options = None
+        if file_path and file_type in ("SQLite", "Excel"):
+            if file_type == "SQLite":
+                source_options = self.choose_sqlite_source(file_path)
+            else:
+                source_options = self.choose_excel_sheets(file_path)
+            if source_options is None:
+                return
 
         if file_path:
+            self.progress_bar.setRange(0, 100)
             self.progress_bar.setVisible(True)
             self.progress_bar.setValue(0)
             self.load_button.setEnabled(False)
             self.load_button.setText("Loading...")
+            self.enable_all_buttons(False)
             
             # Use optimized loading thread
-            self.load_thread = FastDataLoadThread(file_path, file_type, self.chunk_size_spin.value())
+            self.load_thread = FastDataLoadThread(
+                file_path, file_type, self.chunk_size_spin.value(),
+                self.compact_checkbox.isChecked(), self.cache_checkbox.isChecked(),
+                self.streaming_checkbox.isChecked(), self.sketch_error_bound(),
+                self.workers_spin.value(), source_options, self.trace
+            )
             self.load_thread.progress.connect(self.progress_bar.setValue)
             self.load_thread.finished.connect(self.on_file_loaded)
             self.load_thread.error.connect(self.on_load_error)
             self.load_thread.start()
 
+    def choose_items(self, title, items, note=None, checked=None):
+        """Checklist dialog; returns the checked items, or None if cancelled or nothing is checked"""
+        dialog = QDialog(self)
+        dialog.setWindowTitle(title)
+        layout = QVBoxLayout(dialog)
+        if note:
+            layout.addWidget(QLabel(note))
+        item_list = QListWidget()
+        for text in items:
+            item = QListWidgetItem(text)
+            item.setFlags(item.flags() | Qt.ItemIsUserCheckable)
+            item.setCheckState(Qt.Checked if checked is None or text in checked else Qt.Unchecked)
+            item_list.addItem(item)
+        layout.addWidget(item_list)
+        buttons = QDialogButtonBox(QDialogButtonBox.Ok | QDialogButtonBox.Cancel)
+        buttons.accepted.connect(dialog.accept)
+        buttons.rejected.connect(dialog.reject)
+        layout.addWidget(buttons)
+        if dialog.exec_() != QDialog.Accepted:
+            return None
+
+        selected = [item_list.item(i).text() for i in range(item_list.count())
+                    if item_list.item(i).checkState() == Qt.Checked]
+        if not selected:
+            QMessageBox.warning(self, "Warning", "Select at least one item")
+            return None
+        return selected
+
+    def choose_excel_sheets(self, file_path):
+        """Ask which worksheets to load; returns the source options or None if cancelled"""
+        try:
+            sheets = excel_sheet_names(file_path)
+        except Exception as e:
+            QMessageBox.critical(self, "Error", f"Error reading workbook: {str(e)}")
+            return None
+        if len(sheets) <= 1:
+            return {"sheets": sheets}
+        selected = self.choose_items(
+            "Select Sheets", sheets, "Several sheets are stacked with a 'Sheet' column", checked=sheets[:1]
+        )
+        return {"sheets": selected} if selected is not None else None
+
+    def choose_sqlite_source(self, file_path):
+        """Ask which table and columns to load; returns the source options or None if cancelled"""
+        try:
+            conn = connect_sqlite_readonly(file_path)
+            try:
+                tables = sqlite_tables(conn)
+                if not tables:
+                    raise ValueError("Database contains no tables")
+                table = tables[0]
+                if len(tables) > 1:
+                    table, ok = QInputDialog.getItem(self, "Select Table", "Table to load:", tables, 0, False)
+                    if not ok:
+                        return None
+                columns = sqlite_columns(conn, table)
+            finally:
+                conn.close()
+        except Exception as e:
+            QMessageBox.critical(self, "Error", f"Error reading database: {str(e)}")
+            return None
+
+        condition = self.filter_input.text().strip()
+        note = f"Rows are filtered while loading: {condition}" if condition else None
+        selected = self.choose_items(f"Columns of '{table}'", columns, note)
+        if selected is None:
+            return None
+        return {
+            "table": table,
+            "columns": None if len(selected) == len(columns) else selected,
+            "condition": condition or None,
+        }
+
     def on_file_loaded(self, df, message):
         """Handle successful file loading with caching"""
         self.df = df
-        self.original_df = df.copy()
+        self.refresh_performance()
+        self.column_stats.clear()
+        self.sketch = self.load_thread.sketch
+        self.journal = OperationJournal(self.on_data_changed)
+        self.lazy_plan.clear()
+        self.update_pipeline_label()
+        self.memory_saved = self.load_thread.memory_saved
+        if self.load_thread.streaming:
+            self.stream_source = (self.load_thread.file_path, self.load_thread.file_type, self.load_thread.chunk_size,
+                                  self.load_thread.source_options)
+        else:
+            self.stream_source = None
         
         # Clear caches
         self.cached_stats = None
-        self.display_cache = None
         
         self.show_data()
         self.update_column_dropdown()
         self.enable_all_buttons()
+        if self.stream_source is not None:
+            # Cleaning steps are queued and replayed over the whole file on export
+            self.lazy_checkbox.setChecked(True)
+            self.rename_button.setEnabled(False)
+        self.lazy_checkbox.setEnabled(self.stream_source is None)
         
         self.progress_bar.setVisible(False)
         self.load_button.setEnabled(True)
@@ -308,24 +713,250 @@ class FastDataProcessorApp(QWidget):
 
     def on_load_error(self, error_message):
         """Handle file loading errors"""
+        self.refresh_performance()
+        if self.df is not None:
+            self.enable_all_buttons()
         self.progress_bar.setVisible(False)
         self.load_button.setEnabled(True)
         self.load_button.setText("🚀 Load File")
         QMessageBox.critical(self, "Error", f"Error loading file: {error_message}")
 
-    def enable_all_buttons(self):
-        """Enable all buttons after data is loaded"""
-        self.dropna_button.setEnabled(True)
-        self.duplicates_button.setEnabled(True)
-        self.reset_button.setEnabled(True)
-        self.export_button.setEnabled(True)
-        self.filter_button.setEnabled(True)
-        self.plot_button.setEnabled(True)
-        self.stats_button.setEnabled(True)
-        self.correlation_button.setEnabled(True)
-        self.fillna_button.setEnabled(True)
-        self.rename_button.setEnabled(True)
-        self.column_dropdown.setEnabled(True)
+    def enable_all_buttons(self, enabled=True):
+        """Enable all buttons after data is loaded (or disable them while loading)"""
+        self.dropna_button.setEnabled(enabled)
+        self.duplicates_button.setEnabled(enabled)
+        self.reset_button.setEnabled(enabled)
+        self.export_button.setEnabled(enabled)
+        self.filter_button.setEnabled(enabled)
+        self.plot_button.setEnabled(enabled)
+        self.stats_button.setEnabled(enabled)
+        self.correlation_button.setEnabled(enabled)
+        self.fillna_button.setEnabled(enabled)
+        self.rename_button.setEnabled(enabled)
+        self.column_dropdown.setEnabled(enabled)
+        if not enabled:
+            self.undo_button.setEnabled(False)
+            self.redo_button.setEnabled(False)
+
+    def submit_job(self, name, func, on_done=None, on_error=None, stop_queue_on_error=False, category="analysis"):
+        """Queue func(job) on the background scheduler; jobs start with rows_in set to the current row count"""
+        def run(job):
+            if self.df is not None:
+                job.metrics["rows_in"] = len(self.df)
+            return func(job)
+
+        job = Job(name, run, on_done, on_error, stop_queue_on_error, category)
+        self.scheduler.submit(job)
+        self.update_job_status()
+        return job
+
+    def submit_data_job(self, name, func, on_done=None, on_error=None, refresh_columns=False):
+        """Queue a job that changes the data.
+
+        func(job, df) returns (new_df, info). It gets a shallow copy of the
+        data as left by the jobs queued before it, so in-place column changes
+        never touch the frame the table is showing. on_done(info) runs after
+        the table has been refreshed. self.df only changes on success, so func
+        must leave the journal as it found it when it raises or is cancelled.
+        """
+        def run(job):
+            df, info = func(job, self.df.copy(deep=False))
+            job.metrics["rows_out"] = len(df)
+            self.df = df
+            return info
+
+        def done(info):
+            self.cached_stats = None
+            self.show_data()
+            self.update_history_buttons()
+            if refresh_columns:
+                self.update_column_dropdown()
+            if on_done is not None:
+                on_done(info)
+
+        return self.submit_job(name, run, done, on_error, stop_queue_on_error=True, category="cleaning")
+
+    def cancel_jobs(self):
+        self.scheduler.cancel_all()
+        self.update_job_status()
+
+    def on_job_started(self, job):
+        self.progress_bar.setRange(0, 0)  # Busy until the job reports progress
+        self.progress_bar.setVisible(True)
+        self.job_timer.start()
+        self.update_job_status()
+
+    def on_job_progress(self, job, value):
+        if self.scheduler.current is job:
+            self.progress_bar.setRange(0, 100)
+            self.progress_bar.setValue(value)
+
+    def on_job_finished(self, job, result):
+        self.job_done(job)
+        if job.on_done is not None:
+            try:
+                job.on_done(result)
+            except Exception as e:
+                QMessageBox.critical(self, "Error", f"{job.name}: {str(e)}")
+
+    def on_job_failed(self, job, error_message):
+        self.job_done(job)
+        if job.on_error is not None:
+            job.on_error(error_message)
+        else:
+            QMessageBox.critical(self, "Error", f"{job.name} failed: {error_message}")
+
+    def on_job_cancelled(self, job):
+        self.job_done(job, "Cancelled")
+
+    def job_done(self, job, outcome="Finished"):
+        if job.started_at is not None:
+            elapsed = time.perf_counter() - job.started_at
+            self.last_job_text = f"{outcome}: {job.name} in {elapsed:.1f}s"
+        else:
+            self.last_job_text = f"{outcome}: {job.name}"
+        if not self.scheduler.busy():
+            self.job_timer.stop()
+            self.progress_bar.setRange(0, 100)
+            self.progress_bar.setVisible(False)
+        self.update_job_status()
+        self.refresh_performance()
+
+    def refresh_performance(self):
+        """Show the session trace, newest operation first"""
+        records = list(self.trace.records)
+        self.performance_model.set_frame(self.trace.to_frame() if records else None)
+        if records:
+            text = (f"{len(records)} operations · {sum(r['wall_s'] for r in records):.2f}s wall · "
+                    f"{sum(r['cpu_s'] for r in records):.2f}s CPU")
+        else:
+            text = "No operations yet"
+        startup = getattr(self, "startup_timer", None)
+        if startup is not None and startup.interactive_ms() is not None:
+            text += f" · window ready in {startup.interactive_ms():.0f} ms"
+        self.performance_label.setText(text)
+
+    def clear_trace(self):
+        self.trace.clear()
+        self.refresh_performance()
+
+    def export_trace(self):
+        """Save the session trace as JSON records or Chrome trace events"""
+        file_path, selected_filter = QFileDialog.getSaveFileName(
+            self, "Export Trace", "performance_trace.json",
+            "Trace JSON (*.json);;Chrome Trace Events (*.json)"
+        )
+        if not file_path:
+            return
+        chrome = selected_filter.startswith("Chrome")
+        try:
+            self.trace.save(file_path, chrome)
+        except Exception as e:
+            QMessageBox.critical(self, "Error", f"Could not export trace: {str(e)}")
+            return
+        hint = "\nOpen it in chrome://tracing or ui.perfetto.dev" if chrome else ""
+        QMessageBox.information(self, "Success", f"Trace of {len(self.trace.records)} operations saved to {file_path}{hint}")
+
+    def update_job_status(self):
+        """Show the running job, its elapsed time and the queue length"""
+        job = self.scheduler.current
+        queued = len(self.scheduler.pending)
+        if job is not None and job.started_at is not None:
+            text = f"⏳ {job.name} · {time.perf_counter() - job.started_at:.1f}s"
+            if queued:
+                text += f" · {queued} queued"
+        elif queued:
+            text = f"⏳ {queued} queued"
+        else:
+            text = getattr(self, "last_job_text", "")
+        self.job_label.setText(text)
+        self.cancel_button.setVisible(job is not None or queued > 0)
+
+    def closeEvent(self, event):
+        self.scheduler.shutdown()
+        self.executor.shutdown(wait=False)
+        super().closeEvent(event)
+
+    def on_data_changed(self, kind, **info):
+        """Journal callback: keep per-column stats current and drop stale sketches"""
+        self.column_stats.apply_change(kind, **info)
+        self.sketch = None
+
+    def sketch_error_bound(self):
+        """Relative error for approximate statistics, or None when they are off"""
+        return self.approx_error_spin.value() / 100 if self.approx_checkbox.isChecked() else None
+
+    def on_approximate_settings_changed(self, *args):
+        self.cached_stats = None
+
+    def current_sketch(self):
+        """Sketches for the current data, rebuilt in one pass when stale"""
+        error_bound = self.sketch_error_bound()
+        if self.sketch is not None and (self.stream_source is not None or self.sketch.error_bound == error_bound):
+            return self.sketch  # Streaming sketches cover the whole file, not just the preview
+        self.sketch = DatasetSketch(error_bound).update(self.df, self.executor)
+        return self.sketch
+
+    def approximate_statistics_text(self):
+        """Statistics report built from the column sketches"""
+        return approximate_statistics_report(self.current_sketch(), self.df if self.stream_source is None else None)
+
+    def update_history_buttons(self):
+        """Enable undo/redo according to the operation journal"""
+        self.undo_button.setEnabled(self.journal.can_undo() or len(self.lazy_plan) > 0)
+        self.redo_button.setEnabled(self.journal.can_redo() and not len(self.lazy_plan))
+
+    def update_pipeline_label(self):
+        """Show the queued lazy steps"""
+        pending = len(self.lazy_plan)
+        self.pipeline_label.setText(f"Pending ({pending}): {self.lazy_plan.describe()}" if pending else "No pending steps")
+        self.update_history_buttons()
+
+    def queue_step(self, op, **params):
+        """Record a cleaning step in the lazy plan instead of running it"""
+        self.lazy_plan.add(op, **params)
+        self.update_pipeline_label()
+
+    def on_lazy_mode_toggled(self, checked):
+        self.pipeline_label.setVisible(checked)
+        self.run_pipeline_button.setVisible(checked)
+        self.update_pipeline_label()
+        if not checked:
+            self.materialize()
+
+    def materialize(self, report=False):
+        """Queue the pending lazy steps as one job, so later jobs see every requested operation"""
+        if self.df is None or not len(self.lazy_plan) or self.stream_source is not None:
+            return
+        plan = LazyPlan()
+        plan.steps = self.lazy_plan.steps
+        self.lazy_plan.clear()
+        self.update_pipeline_label()
+
+        def run(job, df):
+            return plan.run(df, self.journal), (len(df), None)
+
+        def done(counts):
+            if report:
+                QMessageBox.information(
+                    self, "Success", f"Pipeline: {len(self.df):,} rows remaining (was {counts[0]:,})"
+                )
+
+        def failed(error):
+            # Nothing was applied; put the steps back ahead of any queued since
+            self.lazy_plan.steps[:0] = plan.steps
+            self.update_pipeline_label()
+            QMessageBox.critical(self, "Pipeline Error", error)
+
+        self.submit_data_job(f"Pipeline: {plan.describe()}", run, done, failed)
+
+    def run_pipeline(self):
+        """Run the queued steps now and refresh the table"""
+        if self.stream_source is not None:
+            self.fast_export_data()
+            return
+        if self.df is not None and len(self.lazy_plan):
+            self.materialize(report=True)
 
     def update_column_dropdown(self):
         """Update column dropdown with current dataframe columns"""
@@ -334,239 +965,454 @@ class FastDataProcessorApp(QWidget):
             self.column_dropdown.addItems(self.df.columns.astype(str))
 
     def show_data(self):
-        """Fast data display with caching"""
+        """Fast data display: the model formats visible cells on demand"""
         if self.df is None:
             return
-            
-        # Use cached display data if available
-        if self.display_cache is None:
-            display_rows = min(500, len(self.df))  # Show fewer rows for speed
-            self.display_cache = self.df.head(display_rows)
-        
-        self.table.clear()
-        self.table.setRowCount(0)
-        self.table.setColumnCount(0)
-        
-        self.table.setColumnCount(len(self.display_cache.columns))
-        self.table.setRowCount(len(self.display_cache.index))
-        self.table.setHorizontalHeaderLabels(self.display_cache.columns.astype(str))
-
-        if len(self.df) > 500:
-            self.table.setItem(0, 0, QTableWidgetItem(f"Showing first 500 rows of {len(self.df):,} total rows..."))
-
-        # Fast table population
-        for i in range(len(self.display_cache.index)):
-            for j in range(len(self.display_cache.columns)):
-                value = str(self.display_cache.iat[i, j])
-                self.table.setItem(i, j, QTableWidgetItem(value))
+        self.table_model.set_frame(self.df)
 
     def fast_drop_na(self):
         """Fast null value removal"""
         if self.df is not None:
-            try:
-                before_count = len(self.df)
-                # Use optimized dropna
-                self.df.dropna(inplace=True, axis=0)
-                after_count = len(self.df)
-                
-                # Clear caches
-                self.cached_stats = None
-                self.display_cache = None
-                
-                self.show_data()
-                QMessageBox.information(self, "Success", f"Fast drop: {before_count - after_count:,} rows removed!")
-            except Exception as e:
-                QMessageBox.critical(self, "Error", f"Error dropping null values: {str(e)}")
+            if self.lazy_checkbox.isChecked():
+                self.queue_step("dropna")
+                return
+
+            def run(job, df):
+                keep_mask = df.notna().all(axis=1).to_numpy()
+                job.check()
+                return self.journal.remove_rows(df, keep_mask, "Drop null rows"), len(df) - int(keep_mask.sum())
+
+            self.submit_data_job(
+                "Drop null rows", run,
+                lambda removed: QMessageBox.information(self, "Success", f"Fast drop: {removed:,} rows removed!"),
+                lambda error: QMessageBox.critical(self, "Error", f"Error dropping null values: {error}")
+            )
 
     def fast_remove_duplicates(self):
-        """Fast duplicate removal"""
+        """Fast duplicate removal on chosen key columns, keeping the first, last or no copy"""
         if self.df is not None:
-            try:
-                before_count = len(self.df)
-                # Use optimized drop_duplicates
-                self.df.drop_duplicates(inplace=True, keep='first')
-                after_count = len(self.df)
-                
-                # Clear caches
-                self.cached_stats = None
-                self.display_cache = None
-                
-                self.show_data()
-                QMessageBox.information(self, "Success", f"Fast remove: {before_count - after_count:,} duplicates removed!")
-            except Exception as e:
-                QMessageBox.critical(self, "Error", f"Error removing duplicates: {str(e)}")
+            columns = list(self.df.columns.astype(str))
+            subset = self.choose_items("Duplicate Keys", columns, "Rows match when all checked columns are equal")
+            if subset is None:
+                return
+            subset = None if len(subset) == len(columns) else subset
+            choices = {"Keep first": "first", "Keep last": "last", "Keep none": "none"}
+            choice, ok = QInputDialog.getItem(
+                self, "Remove Duplicates", "Of each set of duplicates:", list(choices), 0, False
+            )
+            if not ok:
+                return
+            keep = choices[choice]
+            if self.lazy_checkbox.isChecked():
+                self.queue_step("dedupe", subset=subset, keep=keep)
+                return
+
+            def run(job, df):
+                keep_mask = dedupe_mask(df, subset, keep)
+                job.check()
+                return self.journal.remove_rows(df, keep_mask, "Remove duplicates"), len(df) - int(keep_mask.sum())
+
+            self.submit_data_job(
+                "Remove duplicates", run,
+                lambda removed: QMessageBox.information(self, "Success", f"Fast remove: {removed:,} duplicates removed!"),
+                lambda error: QMessageBox.critical(self, "Error", f"Error removing duplicates: {error}")
+            )
 
     def reset_data(self):
-        if self.original_df is not None:
-            self.df = self.original_df.copy()
-            self.cached_stats = None
-            self.display_cache = None
-            self.show_data()
-            self.update_column_dropdown()
-            QMessageBox.information(self, "Success", "Data reset to original state!")
+        if self.df is not None:
+            self.lazy_plan.clear()
+            self.update_pipeline_label()
+
+            def run(job, df):
+                undone = 0
+                try:
+                    while self.journal.can_undo():
+                        job.check()
+                        df, _ = self.journal.undo(df)
+                        undone += 1
+                except JobCancelled:
+                    # self.df keeps the current frame, so replay the undone steps to match it
+                    for _ in range(undone):
+                        df, _ = self.journal.redo(df)
+                    raise
+                return df, None
+
+            self.submit_data_job(
+                "Reset to original", run,
+                lambda info: QMessageBox.information(self, "Success", "Data reset to original state!"),
+                refresh_columns=True
+            )
+
+    def undo_step(self):
+        """Revert the most recent cleaning step"""
+        if len(self.lazy_plan):
+            self.lazy_plan.pop()  # Drop the newest queued step first
+            self.update_pipeline_label()
+            return
+        if self.df is not None and self.journal.can_undo():
+            def run(job, df):
+                if not self.journal.can_undo():
+                    return df, None
+                return self.journal.undo(df)
+
+            self.submit_data_job(
+                "Undo", run,
+                lambda label: label and QMessageBox.information(self, "Success", f"Undone: {label}"),
+                lambda error: QMessageBox.critical(self, "Error", f"Error undoing step: {error}"),
+                refresh_columns=True
+            )
+
+    def redo_step(self):
+        """Re-apply the most recently undone cleaning step"""
+        if self.df is not None and self.journal.can_redo():
+            def run(job, df):
+                if not self.journal.can_redo():
+                    return df, None
+                return self.journal.redo(df)
+
+            self.submit_data_job(
+                "Redo", run,
+                lambda label: label and QMessageBox.information(self, "Success", f"Redone: {label}"),
+                lambda error: QMessageBox.critical(self, "Error", f"Error redoing step: {error}"),
+                refresh_columns=True
+            )
 
     def fast_apply_filter(self):
         """Fast filtering with optimization"""
         condition = self.filter_input.text()
         if self.df is not None and condition:
-            try:
-                before_count = len(self.df)
-                # Use optimized query
-                self.df = self.df.query(condition, engine='python')
-                after_count = len(self.df)
-                
-                # Clear caches
-                self.cached_stats = None
-                self.display_cache = None
-                
-                self.show_data()
-                QMessageBox.information(self, "Success", f"Fast filter: {after_count:,} rows remaining (was {before_count:,})")
-            except Exception as e:
-                QMessageBox.critical(self, "Filter Error", str(e))
+            if self.lazy_checkbox.isChecked():
+                self.queue_step("filter", condition=condition)
+                return
+
+            def run(job, df):
+                mask = filter_mask(df, condition)
+                job.check()
+                return self.journal.remove_rows(df, mask, f"Filter: {condition}"), (int(mask.sum()), len(df))
+
+            self.submit_data_job(
+                f"Filter: {condition}", run,
+                lambda counts: QMessageBox.information(
+                    self, "Success", f"Fast filter: {counts[0]:,} rows remaining (was {counts[1]:,})"
+                ),
+                lambda error: QMessageBox.critical(self, "Filter Error", error)
+            )
 
     def fast_fill_null_values(self):
         """Fast null value filling"""
         if self.df is not None and self.column_dropdown.currentText():
             column = self.column_dropdown.currentText()
-            try:
-                # Optimized fillna
-                if pd.api.types.is_numeric_dtype(self.df[column]):
-                    fill_value = self.df[column].median()  # Use median for speed
+            if self.lazy_checkbox.isChecked():
+                self.queue_step("fill", column=column)
+                return
+            approximate = self.approx_checkbox.isChecked()
+
+            def run(job, df):
+                if approximate:
+                    column_sketch = self.current_sketch().columns[column]
+                    if column_sketch.numeric:
+                        fill_value = column_sketch.quantile_sketch.quantiles([0.5])[0]
+                    else:
+                        fill_value = column_sketch.mode()
+                        fill_value = "Unknown" if fill_value is None else fill_value
                 else:
-                    fill_value = self.df[column].mode().iloc[0] if not self.df[column].mode().empty else "Unknown"
-                
-                self.df[column].fillna(fill_value, inplace=True)
-                
-                # Clear caches
-                self.cached_stats = None
-                self.display_cache = None
-                
-                self.show_data()
-                QMessageBox.information(self, "Success", f"Fast fill: '{column}' filled with {fill_value}")
-            except Exception as e:
-                QMessageBox.critical(self, "Error", str(e))
+                    fill_value = null_fill_value(df[column])
+                job.check()
+                return self.journal.fill_nulls(df, column, fill_value, f"Fill nulls in '{column}'"), fill_value
+
+            self.submit_data_job(
+                f"Fill nulls in '{column}'", run,
+                lambda fill_value: QMessageBox.information(
+                    self, "Success", f"Fast fill: '{column}' filled with {fill_value}"
+                )
+            )
 
     def rename_column(self):
+        self.materialize()
         if self.df is not None and self.column_dropdown.currentText():
             old_name = self.column_dropdown.currentText()
-            new_name, ok = QFileDialog.getText(self, "Rename Column", f"Enter new name for '{old_name}':")
+            new_name, ok = QInputDialog.getText(self, "Rename Column", f"Enter new name for '{old_name}':")
             if ok and new_name:
-                try:
-                    self.df.rename(columns={old_name: new_name}, inplace=True)
-                    
-                    # Clear caches
-                    self.cached_stats = None
-                    self.display_cache = None
-                    
-                    self.show_data()
-                    self.update_column_dropdown()
-                    QMessageBox.information(self, "Success", f"Column '{old_name}' renamed to '{new_name}'")
-                except Exception as e:
-                    QMessageBox.critical(self, "Error", str(e))
+                def run(job, df):
+                    label = f"Rename '{old_name}' to '{new_name}'"
+                    return self.journal.rename_column(df, old_name, new_name, label), None
+
+                self.submit_data_job(
+                    f"Rename '{old_name}'", run,
+                    lambda info: QMessageBox.information(
+                        self, "Success", f"Column '{old_name}' renamed to '{new_name}'"
+                    ),
+                    refresh_columns=True
+                )
 
     def fast_show_statistics(self):
         """Fast statistics with caching"""
+        self.materialize()
         if self.df is not None:
-            try:
-                # Use cached stats if available
-                if self.cached_stats is None:
-                    stats_text = "📊 FAST STATISTICS\n" + "="*50 + "\n\n"
-                    
-                    # Fast basic info
-                    stats_text += f"📋 Dataset Info:\n"
-                    stats_text += f"   • Rows: {len(self.df):,}\n"
-                    stats_text += f"   • Columns: {len(self.df.columns)}\n"
-                    stats_text += f"   • Memory: {self.df.memory_usage(deep=True).sum() / (1024*1024):.2f} MB\n\n"
-                    
-                    # Fast null analysis
-                    null_counts = self.df.isnull().sum()
-                    if null_counts.sum() > 0:
-                        stats_text += f"🔍 Null Values:\n"
-                        for col, count in null_counts[null_counts > 0].items():
-                            stats_text += f"   • {col}: {count:,} ({count/len(self.df)*100:.1f}%)\n"
-                        stats_text += "\n"
-                    
-                    # Fast numeric stats
-                    numeric_cols = self.df.select_dtypes(include=[np.number]).columns
-                    if len(numeric_cols) > 0:
-                        stats_text += f"📈 Numeric Statistics:\n"
-                        stats_text += self.df[numeric_cols].describe().to_string()
-                        stats_text += "\n\n"
-                    
-                    # Fast categorical stats
-                    categorical_cols = self.df.select_dtypes(include=['object']).columns
-                    if len(categorical_cols) > 0:
-                        stats_text += f"📝 Categorical Columns:\n"
-                        for col in categorical_cols:
-                            unique_count = self.df[col].nunique()
-                            stats_text += f"   • {col}: {unique_count:,} unique values\n"
-                    
-                    self.cached_stats = stats_text
-                
-                self.stats_text.setText(self.cached_stats)
-                self.tab_widget.setCurrentIndex(1)
-            except Exception as e:
-                QMessageBox.critical(self, "Error", f"Error generating statistics: {str(e)}")
+            # Use cached stats if available
+            if self.cached_stats is not None and not self.scheduler.busy():
+                self.show_statistics_text(self.cached_stats)
+                return
+            builder = self.approximate_statistics_text if self.approx_checkbox.isChecked() else self.exact_statistics_text
+            self.submit_job(
+                "Statistics", lambda job: builder(), self.show_statistics_text,
+                lambda error: QMessageBox.critical(self, "Error", f"Error generating statistics: {error}")
+            )
+
+    def show_statistics_text(self, stats_text):
+        self.cached_stats = stats_text
+        self.stats_text.setText(self.cached_stats)
+        self.tab_widget.setCurrentIndex(1)
+
+    def exact_statistics_text(self):
+        """Statistics report from per-column aggregates computed in parallel"""
+        return statistics_report(self.df, self.column_stats, self.executor, self.memory_saved)
 
     def fast_show_correlation(self):
         """Fast correlation matrix"""
+        self.materialize()
         if self.df is not None:
-            numeric_df = self.df.select_dtypes(include=[np.number])
-            if len(numeric_df.columns) > 1:
-                try:
-                    # Use optimized correlation
-                    correlation_matrix = numeric_df.corr(method='pearson')
-                    plt.figure(figsize=(10, 8))
-                    plt.imshow(correlation_matrix, cmap='coolwarm', aspect='auto')
-                    plt.colorbar()
-                    plt.xticks(range(len(correlation_matrix.columns)), correlation_matrix.columns, rotation=45)
-                    plt.yticks(range(len(correlation_matrix.columns)), correlation_matrix.columns)
-                    plt.title('Fast Correlation Matrix')
-                    plt.tight_layout()
-                    plt.show()
-                except Exception as e:
-                    QMessageBox.critical(self, "Error", f"Could not create correlation matrix: {str(e)}")
-            else:
-                QMessageBox.information(self, "Info", "Need at least 2 numeric columns for correlation matrix")
+            def run(job):
+                numeric_df = self.df.select_dtypes(include='number')
+                return parallel_corr(numeric_df, self.executor) if len(numeric_df.columns) > 1 else None
+
+            self.submit_job(
+                "Correlation matrix", run, self.plot_correlation,
+                lambda error: QMessageBox.critical(self, "Error", f"Could not create correlation matrix: {error}")
+            )
+
+    def plot_correlation(self, correlation_matrix):
+        if correlation_matrix is None:
+            QMessageBox.information(self, "Info", "Need at least 2 numeric columns for correlation matrix")
+            return
+        import matplotlib.pyplot as plt  # Imported on first plot; it is the slowest import we have
+        plt.figure(figsize=(10, 8))
+        plt.imshow(correlation_matrix, cmap='coolwarm', aspect='auto')
+        plt.colorbar()
+        plt.xticks(range(len(correlation_matrix.columns)), correlation_matrix.columns, rotation=45)
+        plt.yticks(range(len(correlation_matrix.columns)), correlation_matrix.columns)
+        plt.title('Fast Correlation Matrix')
+        plt.tight_layout()
+        plt.show()
+
+    def plot_counts(self, result):
+        column, title, counts = result
+        import matplotlib.pyplot as plt
+        plt.figure(figsize=(10, 6))
+        counts.head(20).plot(kind='bar')
+        plt.title(title)
+        plt.ylabel("Count")
+        plt.xlabel(column)
+        plt.xticks(rotation=45)
+        plt.tight_layout()
+        plt.show()
+
+    def on_workers_changed(self, value):
+        """Resize the analysis worker pool"""
+        self.executor.shutdown(wait=False)
+        self.executor = ThreadPoolExecutor(max_workers=value)
 
     def fast_export_data(self):
         """Fast data export"""
-        file_path, _ = QFileDialog.getSaveFileName(
-            self, "Save File", "fast_cleaned_data.csv", "CSV Files (*.csv);;Excel Files (*.xlsx)"
+        if self.stream_source is not None:
+            self.streaming_export()
+            return
+        self.materialize()
+        file_path, selected_filter = QFileDialog.getSaveFileName(
+            self, "Save File", "fast_cleaned_data.csv",
+            "CSV Files (*.csv);;Compressed CSV (*.csv.gz *.csv.bz2 *.csv.xz);;"
+            "Partitioned CSV (*.csv *.csv.gz *.csv.bz2 *.csv.xz);;Excel Files (*.xlsx);;"
+            "Columnar Store (*.dpc);;SQLite DB Files (*.db *.sqlite *.sqlite3)"
         )
-        if file_path:
+        if not file_path:
+            return
+        if selected_filter.startswith(("Compressed", "Partitioned")) or \
+                file_path.lower().endswith(('.csv', '.csv.gz', '.csv.bz2', '.csv.xz')):
+            if selected_filter.startswith("Compressed") and csv_compression(file_path) is None:
+                file_path += ".gz"
+            self.csv_export(file_path, partitioned=selected_filter.startswith("Partitioned"))
+        elif selected_filter.startswith("SQLite") or file_path.endswith(('.db', '.sqlite', '.sqlite3')):
+            if not file_path.endswith(('.db', '.sqlite', '.sqlite3')):
+                file_path = os.path.splitext(file_path)[0] + '.db'
+            self.sqlite_export(file_path)
+        elif selected_filter.startswith("Columnar") or file_path.endswith('.dpc'):
+            if not file_path.endswith('.dpc'):
+                file_path = os.path.splitext(file_path)[0] + '.dpc'
+
+            def run(job):
+                write_columnar(self.df.reset_index(drop=True), file_path)
+                return f"Fast export to {file_path}!"
+            self.submit_export(file_path, run)
+        else:
+            if not file_path.endswith('.xlsx'):
+                file_path = os.path.splitext(file_path)[0] + '.xlsx'
+
+            def run(job):
+                sheets = write_excel(self.df, file_path, progress=job.progress)
+                split = f" across {sheets} sheets" if sheets > 1 else ""
+                return f"Wrote {len(self.df):,} rows to {file_path}{split}"
+            self.submit_export(file_path, run)
+
+    def csv_export(self, file_path, partitioned=False):
+        """Write CSV in the background, optionally split into one file per value or fixed-size shards"""
+        partition_by = shard_rows = None
+        if partitioned:
+            choice, ok = QInputDialog.getItem(
+                self, "Partitioned CSV", "Split output into:", ["One file per column value", "Fixed-size shards"], 0, False
+            )
+            if not ok:
+                return
+            if choice.startswith("One file"):
+                columns = [str(col) for col in self.df.columns]
+                column, ok = QInputDialog.getItem(self, "Partitioned CSV", "Partition column:", columns, 0, False)
+                if not ok:
+                    return
+                partition_by = self.df.columns[columns.index(column)]
+            else:
+                shard_rows, ok = QInputDialog.getInt(
+                    self, "Partitioned CSV", "Rows per shard:", 1000000, 1000, 1000000000, 100000
+                )
+                if not ok:
+                    return
+        workers = self.workers_spin.value()
+
+        def run(job):
+            files = write_csv_parallel(self.df, file_path, workers, partition_by, shard_rows, progress=job.progress)
+            job.metrics["bytes_written"] = sum(os.path.getsize(path) for path in files)
+            if len(files) == 1 and files[0] == file_path:
+                return f"Fast export to {file_path}!"
+            folder = os.path.dirname(files[0]) if files else file_path
+            return f"Wrote {len(self.df):,} rows to {len(files)} files in {folder}"
+        self.submit_export(file_path, run)
+
+    def sqlite_export(self, file_path):
+        """Ask for the target table and indexes, then write in the background"""
+        table, ok = QInputDialog.getText(self, "SQLite Export", "Table name:", text="cleaned_data")
+        if not ok or not table.strip():
+            return
+        table = table.strip()
+        if_exists = "replace"
+        if os.path.exists(file_path):
             try:
-                if file_path.endswith('.csv'):
-                    # Use fast CSV export
-                    self.df.to_csv(file_path, index=False, chunksize=10000)
-                else:
-                    self.df.to_excel(file_path, index=False)
-                QMessageBox.information(self, "Success", f"Fast export to {file_path}!")
+                conn = connect_sqlite_readonly(file_path)
+                try:
+                    exists = table in sqlite_tables(conn)
+                finally:
+                    conn.close()
             except Exception as e:
                 QMessageBox.critical(self, "Error", str(e))
+                return
+            if exists:
+                choice, ok = QInputDialog.getItem(
+                    self, "SQLite Export", f"Table '{table}' already exists:", ["Replace", "Append"], 0, False
+                )
+                if not ok:
+                    return
+                if_exists = choice.lower()
+        columns, ok = QInputDialog.getText(
+            self, "SQLite Export", "Columns to index after loading (comma separated, optional):"
+        )
+        if not ok:
+            return
+        index_columns = [col.strip() for col in columns.split(",") if col.strip()]
+        missing = [col for col in index_columns if col not in self.df.columns]
+        if missing:
+            QMessageBox.warning(self, "Column Error", f"Column '{missing[0]}' not found.")
+            return
+
+        def run(job):
+            start = time.perf_counter()
+            rows = write_sqlite(self.df, file_path, table, if_exists, index_columns, progress=job.progress)
+            elapsed = max(time.perf_counter() - start, 1e-9)
+            return f"Wrote {rows:,} rows to table '{table}' in {file_path} ({rows / elapsed:,.0f} rows/s)"
+        self.submit_export(file_path, run)
+
+    def submit_export(self, file_path, run):
+        """Queue an export job; run(job) returns the success message"""
+        def export(job):
+            message = run(job)
+            job.metrics.setdefault("rows_out", len(self.df))
+            if "bytes_written" not in job.metrics and os.path.exists(file_path):
+                job.metrics["bytes_written"] = path_size(file_path)
+            return message
+
+        self.submit_job(
+            f"Export to {os.path.basename(file_path)}", export,
+            lambda message: QMessageBox.information(self, "Success", message),
+            lambda error: QMessageBox.critical(self, "Error", f"Export failed: {error}"),
+            category="export"
+        )
+
+    def streaming_export(self):
+        """Stream the source file through the queued steps into a CSV file"""
+        file_path, _ = QFileDialog.getSaveFileName(
+            self, "Save File", "fast_cleaned_data.csv", "CSV Files (*.csv)"
+        )
+        if file_path:
+            source_path, source_type, chunk_size, source_options = self.stream_source
+            pipeline = StreamingPipeline(
+                self.lazy_plan, source_path, source_type, chunk_size, self.sketch_error_bound(), source_options
+            )
+
+            def run(job):
+                passes = pipeline.extra_passes() + 1
+
+                def report(value):
+                    job.progress(min(int((pipeline.pass_index * 100 + value) / passes), 99))
+
+                pipeline.prepare(report)
+                pipeline.run(file_path, report)
+                job.metrics.update(rows_in=pipeline.rows_in, rows_out=pipeline.rows_out,
+                                   bytes_read=path_size(source_path) * passes)
+                return f"Streamed {pipeline.rows_in:,} rows, wrote {pipeline.rows_out:,} rows to {file_path}"
+            self.submit_export(file_path, run)
 
     def fast_plot_column(self):
         """Fast plotting"""
+        self.materialize()
         if self.df is not None:
-            try:
-                column, ok = QFileDialog.getText(self, "Column Name", "Enter column name to plot:")
-                if ok and column in self.df.columns:
-                    plt.figure(figsize=(10, 6))
-                    # Use fast plotting
-                    self.df[column].value_counts().head(20).plot(kind='bar')
-                    plt.title(f"Fast Bar Chart: {column}")
-                    plt.ylabel("Count")
-                    plt.xlabel(column)
-                    plt.xticks(rotation=45)
-                    plt.tight_layout()
-                    plt.show()
-                elif ok:
-                    QMessageBox.warning(self, "Column Error", f"Column '{column}' not found.")
-            except Exception as e:
-                QMessageBox.critical(self, "Plot Error", str(e))
+            column, ok = QInputDialog.getText(self, "Column Name", "Enter column name to plot:")
+            if ok and column in self.df.columns:
+                if self.approx_checkbox.isChecked():
+                    run = lambda job: (
+                        column, f"Approximate Bar Chart: {column}",
+                        self.current_sketch().columns[column].heavy_hitters.top(20),
+                    )
+                else:
+                    blocks = self.workers_spin.value()
+                    run = lambda job: (
+                        column, f"Fast Bar Chart: {column}",
+                        parallel_value_counts(self.df[column], self.executor, blocks),
+                    )
+                self.submit_job(
+                    f"Bar chart: {column}", run, self.plot_counts,
+                    lambda error: QMessageBox.critical(self, "Plot Error", error)
+                )
+            elif ok:
+                QMessageBox.warning(self, "Column Error", f"Column '{column}' not found.")
 
-if __name__ == '__main__':
+def main():
+    timer = StartupTimer()
+    start = time.perf_counter()
     app = QApplication(sys.argv)
+    timer.mark("QApplication", start)
+    start = time.perf_counter()
     window = FastDataProcessorApp()
+    timer.mark("Window built", start)
+    start = time.perf_counter()
     window.show()
-    sys.exit(app.exec_())
+    app.processEvents()  # First paint
+    timer.mark("Window shown", start)
+    timer.loaded_before_window = [name for name in DEFERRED_MODULES if name in sys.modules]
+    window.startup_timer = timer
+    warm_thread = threading.Thread(target=warm_up, args=(timer,), daemon=True)
+    warm_thread.start()
+    if "--startup-report" in sys.argv[1:]:
+        # Measure, print and exit, so the startup budget can be checked in CI
+        warm_thread.join()
+        print(timer.report())
+        return 0 if timer.interactive_ms() <= STARTUP_BUDGET_MS else 1
+    return app.exec_()
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,2670 @@
+"""
+Advanced Data Processor - processing core
+=========================================
+
+Loading, cleaning, statistics and export with no GUI dependency. The desktop
+app in code.py drives these functions from its background jobs; the same
+pipeline can run headless over a directory of files:
+
+    python processor.py pipeline.json data/ -o processed/ -w 8
+"""
+
+import sys
+import argparse
+import importlib
+import os
+import io
+import json
+import hashlib
+import pickle
+import shutil
+import time
+import tracemalloc
+import contextlib
+import ast
+import pathlib
+import operator
+import itertools
+import re
+import gzip
+import bz2
+import lzma
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import threading
+import multiprocessing
+try:
+    import resource
+except ImportError:  # Windows has no getrusage; RSS deltas are left out there
+    resource = None
+
+class LazyModule:
+    """Stand-in for a module that is imported on first attribute access.
+
+    On first use the real module replaces the stand-in in the owning module's
+    globals, so later lookups go straight to it.
+    """
+
+    def __init__(self, name, namespace, alias):
+        self._name = name
+        self._namespace = namespace
+        self._alias = alias
+
+    def load(self):
+        module = importlib.import_module(self._name)
+        self._namespace[self._alias] = module
+        return module
+
+    def __getattr__(self, attr):
+        return getattr(self.load(), attr)
+
+# Importing these costs most of a second; the GUI shows its window first and
+# warms pandas up in the background, Excel and SQLite wait until first used
+pd = LazyModule("pandas", globals(), "pd")
+np = LazyModule("numpy", globals(), "np")
+openpyxl = LazyModule("openpyxl", globals(), "openpyxl")
+sqlite3 = LazyModule("sqlite3", globals(), "sqlite3")
+
+LOAD_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".advanced_data_processor", "load_cache")
+LOAD_CACHE_LIMIT_MB = 2048
+DISTINCT_TRACK_LIMIT = 100000
+PARALLEL_CSV_MIN_MB = 64
+EXCEL_MAX_ROWS = 1048576  # Rows per worksheet, header included
+CSV_COMPRESSION_EXTENSIONS = {".gz": "gzip", ".bz2": "bz2", ".xz": "xz"}
+
+class ProgressReader:
+    """File wrapper that reports read progress as a percentage of total bytes"""
+
+    def __init__(self, handle, total_bytes, callback):
+        self.handle = handle
+        self.total_bytes = max(total_bytes, 1)
+        self.callback = callback
+        self.bytes_read = 0
+        self.last_percent = -1
+
+    def read(self, size=-1):
+        data = self.handle.read(size)
+        self.bytes_read += len(data)
+        percent = min(int(self.bytes_read * 100 / self.total_bytes), 99)
+        if percent != self.last_percent:  # Emit only when the value changes
+            self.last_percent = percent
+            self.callback(percent)
+        return data
+
+    def readable(self):
+        return True
+
+    def __iter__(self):
+        return iter(self.handle)
+
+def compact_dataframe(df, category_ratio=0.05, max_categories=1000):
+    """Downcast numeric columns and store low-cardinality text as category.
+
+    Text becomes categorical only when its distinct values are at most
+    category_ratio of the rows and no more than max_categories.
+    Returns the compacted frame and the number of bytes saved.
+    """
+    before = df.memory_usage(deep=True).sum()
+    for col in df.columns:
+        series = df[col]
+        if pd.api.types.is_bool_dtype(series) or isinstance(series.dtype, pd.CategoricalDtype):
+            continue
+        if pd.api.types.is_integer_dtype(series):
+            df[col] = pd.to_numeric(series, downcast='integer')
+        elif pd.api.types.is_float_dtype(series):
+            # Only narrow floats when float32 holds every value exactly
+            narrowed = series.astype(np.float32)
+            if ((narrowed == series) | series.isna()).all():
+                df[col] = narrowed
+        elif pd.api.types.is_object_dtype(series) or pd.api.types.is_string_dtype(series):
+            distinct = series.nunique()
+            if len(series) and distinct <= min(len(series) * category_ratio, max_categories):
+                df[col] = series.astype('category')
+    after = df.memory_usage(deep=True).sum()
+    return df, int(before - after)
+
+def is_masked_column(series):
+    """Nullable numeric/boolean extension columns, and object columns of only booleans and nulls"""
+    dtype = series.dtype
+    if isinstance(dtype, pd.api.extensions.ExtensionDtype) and not isinstance(dtype, pd.CategoricalDtype):
+        return getattr(dtype, "numpy_dtype", np.dtype(object)).kind in "biuf" and dtype.kind in "biuf"
+    return dtype == object and pd.api.types.infer_dtype(series, skipna=True) == "boolean"
+
+def masked_column(values, mask, dtype):
+    """Rebuild a column stored as values plus a null mask"""
+    values, mask = np.array(values), np.array(mask)
+    if dtype == "object":
+        column = values.astype(object)
+        column[mask] = np.nan
+        return column
+    array_type = {"b": pd.arrays.BooleanArray, "f": pd.arrays.FloatingArray}.get(values.dtype.kind, pd.arrays.IntegerArray)
+    return pd.Series(array_type(values, mask), copy=False).astype(dtype)
+
+def write_columnar(df, directory):
+    """Write a DataFrame as one .npy file per column plus a JSON header.
+
+    Numeric, boolean and datetime columns are stored as raw arrays;
+    timezone-aware datetimes as UTC datetime64 with the zone in the header.
+    Nullable numerics and object columns holding only booleans and nulls
+    are stored as a values array plus a .mask.npy null mask. Every other
+    column (text) is dictionary-encoded into int32 codes and a pickled list
+    of distinct values.
+    """
+    if not isinstance(df.index, pd.RangeIndex) or df.index.start != 0 or df.index.step != 1:
+        raise ValueError("Only frames with a default index can be stored")
+    os.makedirs(directory, exist_ok=True)
+    columns = []
+    for i, col in enumerate(df.columns):
+        if not isinstance(col, (str, int, float)):
+            raise ValueError(f"Unsupported column name: {col!r}")
+        series = df[col]
+        entry = {"name": col, "dtype": str(series.dtype)}
+        if isinstance(series.dtype, np.dtype) and series.dtype.kind in "biufcmM":
+            entry["kind"] = "array"
+            np.save(os.path.join(directory, f"{i}.npy"), series.to_numpy())
+        elif isinstance(series.dtype, pd.DatetimeTZDtype):
+            entry["kind"] = "array"
+            entry["tz"] = str(series.dt.tz)
+            np.save(os.path.join(directory, f"{i}.npy"), series.dt.tz_convert("UTC").dt.tz_localize(None).to_numpy())
+        elif is_masked_column(series):
+            entry["kind"] = "masked"
+            mask = series.isna().to_numpy()
+            numpy_dtype = getattr(series.dtype, "numpy_dtype", np.dtype(bool))
+            values = series.to_numpy(dtype=object).copy()
+            values[mask] = False if numpy_dtype.kind == "b" else 0
+            np.save(os.path.join(directory, f"{i}.npy"), values.astype(numpy_dtype))
+            np.save(os.path.join(directory, f"{i}.mask.npy"), mask)
+        elif isinstance(series.dtype, pd.CategoricalDtype):
+            entry["kind"] = "category"
+            entry["ordered"] = bool(series.cat.ordered)
+            np.save(os.path.join(directory, f"{i}.npy"), series.cat.codes.to_numpy())
+            with open(os.path.join(directory, f"{i}.dict"), "wb") as f:
+                pickle.dump(list(series.cat.categories), f, protocol=pickle.HIGHEST_PROTOCOL)
+        else:
+            entry["kind"] = "dictionary"
+            codes, uniques = pd.factorize(series, use_na_sentinel=True)
+            np.save(os.path.join(directory, f"{i}.npy"), codes.astype(np.int32, copy=False))
+            with open(os.path.join(directory, f"{i}.dict"), "wb") as f:
+                pickle.dump(list(uniques), f, protocol=pickle.HIGHEST_PROTOCOL)
+        columns.append(entry)
+    header = {"version": 2, "rows": len(df), "columns": columns}
+    with open(os.path.join(directory, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump(header, f)
+    return header
+
+def read_columnar(directory, mmap_mode=None, decode_dictionary=True):
+    """Read a store written by write_columnar back into a DataFrame.
+
+    With mmap_mode='r' the array columns are views of the mapped files, so
+    only the pages that are actually touched get read. With decode_dictionary
+    off, dictionary columns stay encoded as categoricals instead of being
+    expanded into one object per row.
+    """
+    with open(os.path.join(directory, "meta.json"), "r", encoding="utf-8") as f:
+        header = json.load(f)
+    data = {}
+    for i, entry in enumerate(header["columns"]):
+        codes = np.load(os.path.join(directory, f"{i}.npy"), mmap_mode=mmap_mode)
+        if entry["kind"] == "array":
+            data[i] = codes if "tz" not in entry else \
+                pd.Series(codes, copy=False).dt.tz_localize("UTC").dt.tz_convert(entry["tz"])
+            continue
+        if entry["kind"] == "masked":
+            mask = np.load(os.path.join(directory, f"{i}.mask.npy"), mmap_mode=mmap_mode)
+            data[i] = masked_column(codes, mask, entry["dtype"])
+            continue
+        with open(os.path.join(directory, f"{i}.dict"), "rb") as f:
+            values = pickle.load(f)
+        if entry["kind"] == "category":
+            dtype = pd.CategoricalDtype(pd.Index(values), ordered=entry["ordered"])
+            data[i] = pd.Categorical.from_codes(codes, dtype=dtype)
+        elif not decode_dictionary:
+            data[i] = pd.Categorical.from_codes(codes, dtype=pd.CategoricalDtype(pd.Index(values, dtype=object)))
+        else:
+            uniques = np.empty(len(values) + 1, dtype=object)
+            uniques[:-1] = values
+            uniques[-1] = np.nan  # Code -1 indexes the trailing missing value
+            series = pd.Series(uniques.take(codes), copy=False)
+            data[i] = series if entry["dtype"] == "object" else series.astype(entry["dtype"])
+    df = pd.DataFrame(data, copy=False)
+    df.columns = [entry["name"] for entry in header["columns"]]
+    return df
+
+class LoadCache:
+    """On-disk cache of parsed files keyed by path, size, mtime and load options"""
+
+    def __init__(self, cache_dir=LOAD_CACHE_DIR, limit_mb=LOAD_CACHE_LIMIT_MB):
+        self.cache_dir = cache_dir
+        self.limit_bytes = limit_mb * 1024 * 1024
+
+    def key(self, file_path, options):
+        stat = os.stat(file_path)
+        ident = {
+            "path": os.path.normcase(os.path.abspath(file_path)),
+            "size": stat.st_size,
+            "mtime": stat.st_mtime_ns,
+            "options": options,
+        }
+        return hashlib.sha1(json.dumps(ident, sort_keys=True).encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        """Return (df, extra) for a cached entry, or None on a miss"""
+        entry_dir = os.path.join(self.cache_dir, key)
+        if not os.path.isfile(os.path.join(entry_dir, "meta.json")):
+            return None
+        try:
+            df = read_columnar(entry_dir)
+            with open(os.path.join(entry_dir, "extra.json"), "r", encoding="utf-8") as f:
+                extra = json.load(f)
+        except Exception:
+            shutil.rmtree(entry_dir, ignore_errors=True)  # Drop corrupt entries
+            return None
+        os.utime(os.path.join(entry_dir, "meta.json"))  # Mark as recently used
+        return df, extra
+
+    def fits(self, nbytes):
+        return nbytes <= self.limit_bytes
+
+    def put(self, key, df, extra=None):
+        """Store a frame; frames the columnar format cannot hold or the size cap would evict are skipped"""
+        if not self.fits(df.memory_usage(index=False).sum()):
+            return False
+        entry_dir = os.path.join(self.cache_dir, key)
+        tmp_dir = f"{entry_dir}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            write_columnar(df, tmp_dir)
+            with open(os.path.join(tmp_dir, "extra.json"), "w", encoding="utf-8") as f:
+                json.dump(extra or {}, f)
+            shutil.rmtree(entry_dir, ignore_errors=True)
+            os.replace(tmp_dir, entry_dir)
+        except (OSError, ValueError, pickle.PicklingError):
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            return False
+        self.evict()
+        return True
+
+    def evict(self):
+        """Remove least recently used entries until the cache fits its limit"""
+        entries = []
+        total = 0
+        for name in os.listdir(self.cache_dir):
+            entry_dir = os.path.join(self.cache_dir, name)
+            meta_path = os.path.join(entry_dir, "meta.json")
+            if name.endswith(".tmp") or not os.path.isfile(meta_path):
+                continue
+            size = sum(e.stat().st_size for e in os.scandir(entry_dir) if e.is_file())
+            entries.append((os.path.getmtime(meta_path), size, entry_dir))
+            total += size
+        for _, size, entry_dir in sorted(entries):
+            if total <= self.limit_bytes:
+                break
+            shutil.rmtree(entry_dir, ignore_errors=True)
+            total -= size
+
+class OperationJournal:
+    """Undo/redo history that keeps row positions and small diffs instead of frame copies.
+
+    With keep_history=False steps are applied but nothing is kept for undo,
+    so removed rows are released straight away.
+    """
+
+    def __init__(self, on_change=None, keep_history=True):
+        self.keep_history = keep_history
+        self.undo_stack = []
+        self.redo_stack = []
+        self.on_change = on_change or (lambda kind, **info: None)
+
+    def can_undo(self):
+        return bool(self.undo_stack)
+
+    def can_redo(self):
+        return bool(self.redo_stack)
+
+    def remove_rows(self, df, keep_mask, label):
+        """Keep rows where keep_mask is True; the removed rows are kept for undo"""
+        positions = np.flatnonzero(~np.asarray(keep_mask, dtype=bool))
+        return self._push(df, {"op": "rows", "label": label, "positions": positions})
+
+    def fill_nulls(self, df, column, value, label):
+        return self._push(df, {"op": "fill", "label": label, "column": column, "value": value})
+
+    def rename_column(self, df, old_name, new_name, label):
+        return self._push(df, {"op": "rename", "label": label, "old": old_name, "new": new_name})
+
+    def undo(self, df):
+        step = self.undo_stack.pop()
+        df = self._revert(df, step)
+        self.redo_stack.append(step)
+        return df, step["label"]
+
+    def redo(self, df):
+        step = self.redo_stack.pop()
+        df = self._apply(df, step)
+        self.undo_stack.append(step)
+        return df, step["label"]
+
+    def checkpoint(self):
+        """Marker for rollback(): the current history depth and redo stack"""
+        return len(self.undo_stack), list(self.redo_stack)
+
+    def rollback(self, df, checkpoint):
+        """Revert the steps pushed since checkpoint and restore the redo stack it saw"""
+        depth, redo_stack = checkpoint
+        while len(self.undo_stack) > depth:
+            df = self._revert(df, self.undo_stack.pop())
+        self.redo_stack = redo_stack
+        return df
+
+    def _push(self, df, step):
+        df = self._apply(df, step)
+        if self.keep_history:
+            self.undo_stack.append(step)
+        self.redo_stack.clear()
+        return df
+
+    def _apply(self, df, step):
+        if step["op"] == "rows":
+            positions = step["positions"]
+            if len(positions) == 0:
+                step["removed"] = None
+                return df
+            keep = np.ones(len(df), dtype=bool)
+            keep[positions] = False
+            if self.keep_history:
+                step["removed"] = df.iloc[positions]
+                self.on_change("rows_removed", rows=step["removed"])
+            return df.iloc[keep]
+        if step["op"] == "fill":
+            column, value = step["column"], step["value"]
+            series = df[column]
+            step["positions"] = np.flatnonzero(series.isna().to_numpy())
+            step["added_category"] = (
+                isinstance(series.dtype, pd.CategoricalDtype) and value not in series.cat.categories
+            )
+            if step["added_category"]:
+                series = series.cat.add_categories([value])
+            df[column] = series.fillna(value)
+            self.on_change("column_changed", column=column)
+            return df
+        df.rename(columns={step["old"]: step["new"]}, inplace=True)
+        self.on_change("column_renamed", column=step["old"], new_name=step["new"])
+        return df
+
+    def _revert(self, df, step):
+        if step["op"] == "rows":
+            removed = step.pop("removed")
+            if removed is None:
+                return df
+            # Interleave the removed rows back at their original positions
+            positions = step["positions"]
+            total = len(df) + len(removed)
+            kept = np.ones(total, dtype=bool)
+            kept[positions] = False
+            order = np.empty(total, dtype=np.intp)
+            order[kept] = np.arange(len(df))
+            order[positions] = np.arange(len(df), total)
+            self.on_change("rows_restored", rows=removed)
+            return pd.concat([df, removed]).iloc[order]
+        if step["op"] == "fill":
+            column = step["column"]
+            series = df[column].copy()
+            series.iloc[step["positions"]] = np.nan
+            if step["added_category"]:
+                series = series.cat.remove_categories([step["value"]])
+            df[column] = series
+            self.on_change("column_changed", column=column)
+            return df
+        df.rename(columns={step["new"]: step["old"]}, inplace=True)
+        self.on_change("column_renamed", column=step["new"], new_name=step["old"])
+        return df
+
+class UnsupportedExpression(Exception):
+    """Raised when a filter needs the pandas fallback engine"""
+
+class FilterEngine:
+    """Compiles filter conditions into vectorized NumPy mask functions.
+
+    Conditions are parsed once with ast and turned into closures that work on
+    the column arrays directly: comparisons, ranges, arithmetic, and/or/not,
+    ``in`` lists and ``.str.startswith/endswith/contains``, ``.isin``,
+    ``.between`` and null checks. On categorical columns, equality, ``in``
+    and string matching are evaluated once per category and mapped through
+    the codes. Anything else falls back to ``DataFrame.eval`` with the
+    Python engine. Compiled conditions are cached by their text.
+    """
+
+    COMPARE_OPS = {
+        ast.Eq: operator.eq, ast.NotEq: operator.ne, ast.Lt: operator.lt,
+        ast.LtE: operator.le, ast.Gt: operator.gt, ast.GtE: operator.ge,
+    }
+    BINARY_OPS = {
+        ast.Add: operator.add, ast.Sub: operator.sub, ast.Mult: operator.mul,
+        ast.Div: operator.truediv, ast.FloorDiv: operator.floordiv,
+        ast.Mod: operator.mod, ast.Pow: operator.pow,
+    }
+    MASK_OPS = {ast.BitAnd: operator.and_, ast.BitOr: operator.or_}
+    STRING_METHODS = ("startswith", "endswith", "contains")
+    NULL_METHODS = {"isnull": True, "isna": True, "notnull": False, "notna": False}
+    SQL_COMPARE_OPS = {ast.Eq: "=", ast.NotEq: "<>", ast.Lt: "<", ast.LtE: "<=", ast.Gt: ">", ast.GtE: ">="}
+    SQL_BINARY_OPS = {ast.Add: "+", ast.Sub: "-", ast.Mult: "*"}
+    SQL_MASK_OPS = {ast.BitAnd: " AND ", ast.BitOr: " OR "}
+    REGEX_CHARS = set(".^$*+?{}[]\\|()")
+
+    def __init__(self, cache_size=128):
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def mask(self, df, condition):
+        """Return a boolean numpy mask for condition evaluated against df"""
+        compiled = self.compile(condition)
+        if compiled is not None:
+            try:
+                result = compiled(df)
+                if isinstance(result, pd.Series):
+                    result = result.to_numpy(dtype=bool, na_value=False) if result.dtype == "boolean" else \
+                        result.to_numpy()
+                if isinstance(result, np.ndarray) and result.dtype == bool and len(result) == len(df):
+                    return result
+            except (UnsupportedExpression, TypeError, AttributeError, OverflowError):
+                pass  # Let pandas evaluate it (and report any real error)
+        result = df.eval(condition, engine='python')
+        if not (isinstance(result, pd.Series) and pd.api.types.is_bool_dtype(result)):
+            raise ValueError("Filter condition must evaluate to True/False for each row")
+        return result.to_numpy(dtype=bool, na_value=False)  # Nullable comparisons: a missing value never matches
+
+    def compile(self, condition):
+        """Compile condition to a callable, or None when only pandas can evaluate it"""
+        with self._lock:
+            if condition in self._cache:
+                self._cache.move_to_end(condition)
+                return self._cache[condition]
+        try:
+            compiled = self._node(ast.parse(condition.strip(), mode='eval').body)
+        except (SyntaxError, UnsupportedExpression):
+            compiled = None
+        with self._lock:
+            self._cache[condition] = compiled
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return compiled
+
+    def _node(self, node):
+        if isinstance(node, ast.BoolOp):
+            parts = [self._node(value) for value in node.values]
+            combine = operator.and_ if isinstance(node.op, ast.And) else operator.or_
+
+            def bool_op(df):
+                result = self._as_mask(parts[0](df))
+                for part in parts[1:]:
+                    result = combine(result, self._as_mask(part(df)))
+                return result
+            return bool_op
+        if isinstance(node, ast.UnaryOp):
+            operand = self._node(node.operand)
+            if isinstance(node.op, (ast.Not, ast.Invert)):
+                return lambda df: ~self._as_mask(operand(df))
+            if isinstance(node.op, ast.USub):
+                return lambda df: -self._widen(operand(df))
+            raise UnsupportedExpression()
+        if isinstance(node, ast.Compare):
+            return self._compare_chain(node)
+        if isinstance(node, ast.BinOp) and type(node.op) in self.MASK_OPS:
+            # "(a > 1) & (b < 2)": only bool masks are combined, so bitwise math on integers still goes to pandas
+            op = self.MASK_OPS[type(node.op)]
+            left, right = self._node(node.left), self._node(node.right)
+            return lambda df: op(self._as_mask(left(df)), self._as_mask(right(df)))
+        if isinstance(node, ast.BinOp) and type(node.op) in self.BINARY_OPS:
+            op = self.BINARY_OPS[type(node.op)]
+            left, right = self._node(node.left), self._node(node.right)
+            return lambda df: op(self._widen(left(df)), self._widen(right(df)))
+        if isinstance(node, ast.Name):
+            name = node.id
+            return lambda df: self._column(df, name)
+        if isinstance(node, ast.Constant):
+            value = node.value
+            return lambda df: value
+        if isinstance(node, (ast.List, ast.Tuple)):
+            values = [self._constant(element) for element in node.elts]
+            return lambda df: values
+        if isinstance(node, ast.Call):
+            return self._call(node)
+        raise UnsupportedExpression()
+
+    def to_sql(self, condition, columns):
+        """Translate condition into a SQL WHERE clause and its parameters.
+
+        Missing values behave as in pandas: comparisons against NULL are false,
+        except ``!=`` and ``not in``, which are true. Raises
+        UnsupportedExpression when there is no exact SQL equivalent.
+        """
+        try:
+            node = ast.parse(condition.strip(), mode='eval').body
+        except SyntaxError:
+            raise UnsupportedExpression()
+        params = []
+        return self._sql_predicate(node, set(columns), params), params
+
+    def _sql_predicate(self, node, columns, params):
+        """SQL for a boolean node; never evaluates to NULL"""
+        if isinstance(node, ast.BoolOp):
+            joiner = " AND " if isinstance(node.op, ast.And) else " OR "
+            return "(" + joiner.join(self._sql_predicate(value, columns, params) for value in node.values) + ")"
+        if isinstance(node, ast.BinOp) and type(node.op) in self.SQL_MASK_OPS:
+            left = self._sql_predicate(node.left, columns, params)
+            right = self._sql_predicate(node.right, columns, params)
+            return f"({left}{self.SQL_MASK_OPS[type(node.op)]}{right})"
+        if isinstance(node, ast.UnaryOp) and isinstance(node.op, (ast.Not, ast.Invert)):
+            return f"(NOT {self._sql_predicate(node.operand, columns, params)})"
+        if isinstance(node, ast.Compare):
+            operands = [node.left] + node.comparators
+            parts = [self._sql_compare(op, left, right, columns, params)
+                     for op, left, right in zip(node.ops, operands, operands[1:])]
+            return "(" + " AND ".join(parts) + ")"
+        if isinstance(node, ast.Call):
+            return self._sql_call(node, columns, params)
+        raise UnsupportedExpression()
+
+    def _sql_compare(self, op, left, right, columns, params):
+        if isinstance(op, (ast.In, ast.NotIn)) or (isinstance(right, (ast.List, ast.Tuple))
+                                                    and isinstance(op, (ast.Eq, ast.NotEq))):
+            if not isinstance(right, (ast.List, ast.Tuple)):
+                raise UnsupportedExpression()
+            negate = isinstance(op, (ast.NotIn, ast.NotEq))
+            return self._sql_in(self._sql_value(left, columns, params),
+                                [self._constant(element) for element in right.elts], negate, params)
+        if type(op) not in self.SQL_COMPARE_OPS:
+            raise UnsupportedExpression()
+        left_sql = self._sql_value(left, columns, params)
+        right_sql = self._sql_value(right, columns, params)
+        missing = 1 if isinstance(op, ast.NotEq) else 0
+        return f"COALESCE({left_sql} {self.SQL_COMPARE_OPS[type(op)]} {right_sql}, {missing})"
+
+    def _sql_in(self, value_sql, values, negate, params):
+        if not values:
+            return "1" if negate else "0"
+        params.extend(values)
+        placeholders = ", ".join("?" * len(values))
+        if negate:
+            return f"COALESCE({value_sql} NOT IN ({placeholders}), 1)"
+        return f"COALESCE({value_sql} IN ({placeholders}), 0)"
+
+    def _sql_value(self, node, columns, params):
+        if isinstance(node, ast.Name):
+            if node.id not in columns:
+                raise UnsupportedExpression()
+            return quote_identifier(node.id)
+        if isinstance(node, ast.Constant) and isinstance(node.value, (int, float, str)):
+            params.append(node.value)
+            return "?"
+        if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.USub):
+            return f"(-{self._sql_value(node.operand, columns, params)})"
+        if isinstance(node, ast.BinOp) and type(node.op) in self.SQL_BINARY_OPS:
+            left = self._sql_value(node.left, columns, params)
+            right = self._sql_value(node.right, columns, params)
+            return f"({left} {self.SQL_BINARY_OPS[type(node.op)]} {right})"
+        raise UnsupportedExpression()
+
+    def _sql_call(self, node, columns, params):
+        func = node.func
+        if not isinstance(func, ast.Attribute) or node.keywords:
+            raise UnsupportedExpression()
+        method = func.attr
+        if method in self.STRING_METHODS and isinstance(func.value, ast.Attribute) and func.value.attr == "str" \
+                and len(node.args) == 1:
+            column = self._sql_value(func.value.value, columns, params)
+            pattern = self._constant(node.args[0])
+            if not isinstance(pattern, str) or (method == "contains" and self.REGEX_CHARS & set(pattern)):
+                raise UnsupportedExpression()
+            if not pattern:
+                return f"({column} IS NOT NULL)"
+            if method == "startswith":
+                params.extend([len(pattern), pattern])
+                return f"COALESCE(substr({column}, 1, ?) = ?, 0)"
+            if method == "endswith":
+                params.extend([-len(pattern), pattern])
+                return f"COALESCE(substr({column}, ?) = ?, 0)"
+            params.append(pattern)
+            return f"COALESCE(instr({column}, ?) > 0, 0)"
+        if not isinstance(func.value, ast.Name):
+            raise UnsupportedExpression()
+        column = self._sql_value(func.value, columns, params)
+        if method == "isin" and len(node.args) == 1 and isinstance(node.args[0], (ast.List, ast.Tuple)):
+            return self._sql_in(column, [self._constant(element) for element in node.args[0].elts], False, params)
+        if method == "between" and len(node.args) == 2:
+            params.extend(self._constant(arg) for arg in node.args)
+            return f"COALESCE({column} BETWEEN ? AND ?, 0)"
+        if method in self.NULL_METHODS and not node.args:
+            return f"({column} IS {'' if self.NULL_METHODS[method] else 'NOT '}NULL)"
+        raise UnsupportedExpression()
+
+    def _constant(self, node):
+        if isinstance(node, ast.Constant):
+            return node.value
+        if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.USub) and isinstance(node.operand, ast.Constant):
+            return -node.operand.value
+        raise UnsupportedExpression()
+
+    def _compare_chain(self, node):
+        operands = [self._node(node.left)] + [self._node(c) for c in node.comparators]
+        ops = node.ops
+        for op in ops:
+            if type(op) not in self.COMPARE_OPS and not isinstance(op, (ast.In, ast.NotIn)):
+                raise UnsupportedExpression()
+
+        def compare_chain(df):
+            values = [operand(df) for operand in operands]
+            result = None
+            for op, left, right in zip(ops, values, values[1:]):
+                part = self._compare(op, left, right)
+                result = part if result is None else result & part
+            return result
+        return compare_chain
+
+    def _compare(self, op, left, right):
+        if isinstance(op, (ast.In, ast.NotIn)) or (isinstance(right, list) and isinstance(op, (ast.Eq, ast.NotEq))):
+            if not isinstance(right, list):
+                raise UnsupportedExpression()
+            result = self._isin(left, right)
+            return ~result if isinstance(op, (ast.NotIn, ast.NotEq)) else result
+        compare = self.COMPARE_OPS[type(op)]
+        if isinstance(left, pd.Series) and isinstance(left.dtype, pd.CategoricalDtype) and np.isscalar(right) \
+                and isinstance(op, (ast.Eq, ast.NotEq)):
+            matches = np.asarray(left.cat.categories == right, dtype=bool)
+            result = self._by_codes(left, matches)
+            return ~result if isinstance(op, ast.NotEq) else result
+        # Ordering and column-to-column comparisons see the values, as they would without compact mode
+        return self._as_mask(compare(self._decoded(left), self._decoded(right)))
+
+    def _isin(self, values, candidates):
+        if isinstance(values, pd.Series):
+            if isinstance(values.dtype, pd.CategoricalDtype):
+                return self._by_codes(values, values.cat.categories.isin(candidates))
+            return values.isin(candidates).to_numpy()
+        if isinstance(values, np.ndarray):
+            return np.isin(values, candidates)
+        raise UnsupportedExpression()
+
+    def _call(self, node):
+        func = node.func
+        if not isinstance(func, ast.Attribute) or node.keywords:
+            raise UnsupportedExpression()
+        args = [self._constant(arg) if not isinstance(arg, (ast.List, ast.Tuple)) else
+                [self._constant(element) for element in arg.elts] for arg in node.args]
+        method = func.attr
+        # col.str.startswith('x') / col.str.contains('x')
+        if method in self.STRING_METHODS and isinstance(func.value, ast.Attribute) \
+                and func.value.attr == "str" and isinstance(func.value.value, ast.Name) and len(args) == 1:
+            name, pattern = func.value.value.id, args[0]
+            return lambda df: self._string_match(self._series(df, name), method, pattern)
+        if not isinstance(func.value, ast.Name):
+            raise UnsupportedExpression()
+        name = func.value.id
+        if method == "isin" and len(args) == 1 and isinstance(args[0], list):
+            return lambda df: self._isin(self._series(df, name), args[0])
+        if method == "between" and len(args) == 2:
+            low, high = args
+            return lambda df: self._series(df, name).between(low, high).to_numpy()
+        if method in self.NULL_METHODS and not args:
+            want_null = self.NULL_METHODS[method]
+
+            def null_check(df):
+                nulls = self._series(df, name).isna().to_numpy()
+                return nulls if want_null else ~nulls
+            return null_check
+        raise UnsupportedExpression()
+
+    def _string_match(self, series, method, pattern):
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            categories = pd.Series(series.cat.categories.astype(str))
+            matches = getattr(categories.str, method)(pattern)
+            return self._by_codes(series, matches.fillna(False).to_numpy(dtype=bool))
+        return getattr(series.str, method)(pattern, na=False).to_numpy(dtype=bool)
+
+    def _decoded(self, value):
+        if isinstance(value, pd.Series) and isinstance(value.dtype, pd.CategoricalDtype):
+            return value.astype(value.cat.categories.dtype if not value.hasnans else object)
+        return value
+
+    def _by_codes(self, series, category_mask):
+        """Expand a per-category boolean array to rows; missing values are False"""
+        lookup = np.append(np.asarray(category_mask, dtype=bool), False)
+        return lookup[series.cat.codes.to_numpy()]
+
+    def _column(self, df, name):
+        series = self._series(df, name)
+        if isinstance(series.dtype, np.dtype) and series.dtype.kind in "biuf":
+            return series.to_numpy()
+        return series
+
+    def _widen(self, value):
+        """Do arithmetic in 64 bits, so columns narrowed by compact mode cannot wrap around"""
+        if isinstance(value, np.ndarray) and value.dtype.itemsize < 8:
+            if value.dtype.kind in "iu":
+                return value.astype(np.int64)
+            if value.dtype.kind == "f":
+                return value.astype(np.float64)
+        return value
+
+    def _series(self, df, name):
+        if name not in df.columns:
+            raise UnsupportedExpression()
+        return df[name]
+
+    def _as_mask(self, value):
+        if isinstance(value, pd.Series):
+            value = value.to_numpy()
+        if not isinstance(value, np.ndarray) or value.dtype != bool:
+            raise UnsupportedExpression()
+        return value
+
+FILTER_ENGINE = FilterEngine()
+
+def filter_mask(df, condition):
+    """Evaluate a filter condition into a boolean row mask"""
+    return FILTER_ENGINE.mask(df, condition)
+
+def null_fill_value(series):
+    """Median for numeric columns, most frequent value otherwise"""
+    if pd.api.types.is_numeric_dtype(series):
+        return series.median()  # Use median for speed
+    mode = series.mode()
+    return mode.iloc[0] if not mode.empty else "Unknown"
+
+class LazyPlan:
+    """Records cleaning steps and runs them as fused passes when results are needed.
+
+    Steps are grouped into segments that end at a null fill. Within a segment
+    every filter and the null-row check are combined into one row mask, applied
+    with a single take, and duplicate removal runs once afterwards on the
+    surviving rows. Filters are assumed to be row-wise conditions, which
+    commute with whole-row duplicate removal and with null-row removal. A
+    dedupe on key columns does not commute with them, so any step after it
+    starts a new segment.
+    """
+
+    def __init__(self):
+        self.steps = []
+
+    def __len__(self):
+        return len(self.steps)
+
+    def add(self, op, **params):
+        self.steps.append(dict(op=op, **params))
+
+    @staticmethod
+    def dedupe_params(step):
+        return {"subset": step.get("subset") or None, "keep": step.get("keep", "first")}
+
+    def pop(self):
+        return self.steps.pop()
+
+    def clear(self):
+        self.steps = []
+
+    def describe(self):
+        names = {"dropna": "drop nulls", "dedupe": "dedupe", "filter": "filter", "fill": "fill"}
+        return " → ".join(
+            f"dedupe on {', '.join(step['subset'])}" if step["op"] == "dedupe" and step.get("subset")
+            else names[step["op"]] for step in self.steps
+        )
+
+    def optimize(self):
+        """Group the recorded steps into fused segments"""
+        segments = []
+        segment = None
+        for step in self.steps:
+            if segment is None or (step["op"] != "fill" and (segment["fill"] or not self.fuses(segment, step))):
+                segment = {"filters": [], "dropna": False, "dedupe": None, "fill": []}
+                segments.append(segment)
+            if step["op"] == "filter":
+                segment["filters"].append(step["condition"])
+            elif step["op"] == "dropna":
+                segment["dropna"] = True
+            elif step["op"] == "dedupe":
+                segment["dedupe"] = self.dedupe_params(step)
+            elif step["column"] not in segment["fill"]:
+                segment["fill"].append(step["column"])
+        return segments
+
+    def fuses(self, segment, step):
+        """Whether step can join a segment that may already hold a dedupe"""
+        dedupe = segment["dedupe"]
+        if dedupe is None:
+            return True
+        if step["op"] == "dedupe":
+            return self.dedupe_params(step) == dedupe
+        return dedupe["subset"] is None
+
+    def run(self, df, journal):
+        """Execute the plan against df, recording each fused pass in the journal.
+
+        If a step fails, the passes already recorded are rolled back so the
+        journal still matches the frame the caller holds.
+        """
+        checkpoint = journal.checkpoint()
+        latest = [df]  # The frame as of the last recorded pass, which is what rollback must revert
+        try:
+            df = self._run_segments(df, journal, latest)
+        except Exception:
+            journal.rollback(latest[0], checkpoint)
+            raise
+        self.clear()
+        return df
+
+    def _run_segments(self, df, journal, latest):
+        for segment in self.optimize():
+            keep = None
+            for condition in segment["filters"]:
+                mask = filter_mask(df, condition)
+                keep = mask if keep is None else keep & mask
+            if segment["dropna"]:
+                mask = df.notna().all(axis=1).to_numpy()
+                keep = mask if keep is None else keep & mask
+            if keep is not None:
+                label = " + ".join(
+                    [f"Filter: {c}" for c in segment["filters"]] + (["Drop null rows"] if segment["dropna"] else [])
+                )
+                df = latest[0] = journal.remove_rows(df, keep, label)
+            if segment["dedupe"]:
+                df = latest[0] = journal.remove_rows(df, dedupe_mask(df, **segment["dedupe"]), "Remove duplicates")
+            for column in segment["fill"]:
+                df = latest[0] = journal.fill_nulls(
+                    df, column, null_fill_value(df[column]), f"Fill nulls in '{column}'"
+                )
+        return df
+
+def quote_identifier(name):
+    """Quote a table or column name for SQLite"""
+    return '"' + str(name).replace('"', '""') + '"'
+
+def connect_sqlite_readonly(file_path):
+    """Open a SQLite database read-only with pragmas suited to large scans"""
+    uri = pathlib.Path(file_path).resolve().as_uri() + "?mode=ro"
+    conn = sqlite3.connect(uri, uri=True)
+    conn.execute("PRAGMA query_only = ON")
+    conn.execute("PRAGMA cache_size = -262144")  # 256 MB page cache
+    conn.execute("PRAGMA mmap_size = 1073741824")
+    conn.execute("PRAGMA temp_store = MEMORY")
+    return conn
+
+def sqlite_tables(conn):
+    """Names of the user tables and views in a database"""
+    rows = conn.execute(
+        "SELECT name FROM sqlite_master WHERE type IN ('table', 'view') AND name NOT LIKE 'sqlite_%' ORDER BY rowid"
+    ).fetchall()
+    return [row[0] for row in rows]
+
+def sqlite_columns(conn, table):
+    return [row[1] for row in conn.execute(f"PRAGMA table_info({quote_identifier(table)})")]
+
+def iter_sqlite_chunks(file_path, chunk_size, progress=None, source_options=None, report=None):
+    """Yield rows of one SQLite table as DataFrame chunks.
+
+    source_options may name the table, the columns to read and a filter
+    condition. The condition becomes the WHERE clause when it translates to
+    SQL, otherwise it is applied to each chunk as it arrives. report, if
+    given, is filled with the table name and whether the filter was pushed down.
+    """
+    progress = progress or (lambda value: None)
+    options = source_options or {}
+    conn = connect_sqlite_readonly(file_path)
+    try:
+        table = options.get("table")
+        if table is None:
+            tables = sqlite_tables(conn)
+            if not tables:
+                raise ValueError("Database contains no tables")
+            table = tables[0]
+        all_columns = sqlite_columns(conn, table)
+        columns = options.get("columns") or all_columns
+        condition = (options.get("condition") or "").strip()
+        where, params, post_filter = "", [], None
+        if condition:
+            try:
+                clause, params = FILTER_ENGINE.to_sql(condition, all_columns)
+                where = f" WHERE {clause}"
+            except UnsupportedExpression:
+                post_filter = condition
+        # Filtering in pandas may need columns that are not being kept
+        selected = all_columns if post_filter else columns
+        query = f"SELECT {', '.join(map(quote_identifier, selected))} FROM {quote_identifier(table)}{where}"
+        if report is not None:
+            report.update(table=table, pushed_down=bool(condition) and post_filter is None)
+
+        # The unfiltered row count bounds the progress estimate
+        total_rows = max(conn.execute(f"SELECT COUNT(*) FROM {quote_identifier(table)}").fetchone()[0], 1)
+        rows_read = 0
+        for chunk in pd.read_sql_query(query, conn, params=params, chunksize=chunk_size):
+            rows_read += len(chunk)
+            progress(min(int(rows_read * 100 / total_rows), 99))
+            if post_filter:
+                chunk = chunk[filter_mask(chunk, post_filter)][columns]
+            yield chunk
+    finally:
+        conn.close()
+
+def sqlite_column_type(dtype):
+    if isinstance(dtype, pd.CategoricalDtype):
+        dtype = dtype.categories.dtype
+    if pd.api.types.is_bool_dtype(dtype) or pd.api.types.is_integer_dtype(dtype):
+        return "INTEGER"
+    if pd.api.types.is_float_dtype(dtype):
+        return "REAL"
+    return "TEXT"
+
+def sqlite_values(series):
+    """Column values as Python objects that sqlite3 binds directly, with None for missing"""
+    if isinstance(series.dtype, np.dtype) and series.dtype.kind in "mM":
+        values = series.astype(str).to_numpy(dtype=object)
+    else:
+        values = series.to_numpy(dtype=object)
+    missing = series.isna().to_numpy()
+    if missing.any():
+        values[missing] = None
+    return values
+
+def write_sqlite(df, file_path, table, if_exists="replace", index_columns=(), batch_size=50000, progress=None):
+    """Write df to a SQLite table with batched executemany inserts.
+
+    The table is created from the frame's dtypes, rows go in one transaction
+    per batch with the rollback journal in memory and synchronous writes off,
+    and indexes are built once after all rows are in. Each INSERT carries
+    several rows, which cuts the per-statement overhead of executemany.
+    """
+    progress = progress or (lambda value: None)
+    conn = sqlite3.connect(file_path)
+    try:
+        conn.execute("PRAGMA journal_mode = MEMORY")
+        conn.execute("PRAGMA synchronous = OFF")
+        conn.execute("PRAGMA cache_size = -262144")
+        conn.execute("PRAGMA temp_store = MEMORY")
+        name = quote_identifier(table)
+        exists = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)
+        ).fetchone() is not None
+        if exists and if_exists == "fail":
+            raise ValueError(f"Table '{table}' already exists")
+        with conn:
+            if exists and if_exists == "replace":
+                conn.execute(f"DROP TABLE {name}")
+            if not exists or if_exists == "replace":
+                columns_sql = ", ".join(f"{quote_identifier(col)} {sqlite_column_type(df[col].dtype)}"
+                                        for col in df.columns)
+                conn.execute(f"CREATE TABLE {name} ({columns_sql})")
+        width = len(df.columns)
+        row_sql = f"({', '.join('?' * width)})"
+        # Stay under SQLite's default limit of 999 bound parameters per statement
+        rows_per_insert = max(1, min(64, 999 // max(width, 1)))
+        insert_many = f"INSERT INTO {name} VALUES {', '.join([row_sql] * rows_per_insert)}"
+        insert_one = f"INSERT INTO {name} VALUES {row_sql}"
+        total_rows = max(len(df), 1)
+        for start in range(0, len(df), batch_size):
+            batch = df.iloc[start:start + batch_size]
+            rows = np.empty((len(batch), width), dtype=object)
+            for i, col in enumerate(batch.columns):
+                rows[:, i] = sqlite_values(batch.iloc[:, i])
+            grouped = len(rows) - len(rows) % rows_per_insert
+            with conn:
+                conn.executemany(insert_many, rows[:grouped].reshape(-1, rows_per_insert * width).tolist())
+                conn.executemany(insert_one, rows[grouped:].tolist())
+            progress(min(int((start + len(batch)) * 95 / total_rows), 95))
+        for col in index_columns:
+            index_name = quote_identifier(f"ix_{table}_{col}")
+            with conn:
+                conn.execute(f"CREATE INDEX IF NOT EXISTS {index_name} ON {name} ({quote_identifier(col)})")
+        progress(100)
+    finally:
+        conn.close()
+    return len(df)
+
+def flatten_nested(df, sep="."):
+    """Expand columns that hold dicts into one column per key, recursively.
+
+    {"user": {"id": 1}} becomes a "user.id" column at the position of "user".
+    """
+    while True:
+        nested = [col for col in df.columns
+                  if df[col].dtype == object and df[col].map(type).eq(dict).any()]
+        if not nested:
+            return df
+        pieces = []
+        for col in df.columns:
+            if col not in nested:
+                pieces.append(df[[col]])
+                continue
+            values = df[col]
+            is_dict = values.map(type).eq(dict)
+            records = values.where(is_dict, None).map(lambda value: value if value is not None else {})
+            expanded = pd.DataFrame.from_records(records.tolist(), index=df.index)
+            expanded.columns = [f"{col}{sep}{key}" for key in expanded.columns]
+            if values[~is_dict].notna().any():
+                pieces.append(values.where(~is_dict).to_frame())  # Keep scalars that sit beside dicts
+            pieces.append(expanded)
+        df = pd.concat(pieces, axis=1)
+
+def iter_json_lines_chunks(file_path, chunk_size, progress=None, fixed_columns=False):
+    """Yield a JSON Lines file as flattened DataFrame chunks of at most chunk_size records.
+
+    Only one chunk of lines is held at a time. Records may have different
+    keys; with fixed_columns every chunk is aligned to the columns of the
+    first one, which keeps streamed CSV output rectangular.
+    """
+    progress = progress or (lambda value: None)
+    total_bytes = max(os.path.getsize(file_path), 1)
+    columns = None
+    with open(file_path, 'rb') as handle:
+        while True:
+            lines = [line for line in itertools.islice(handle, chunk_size) if line.strip()]
+            if not lines:
+                break
+            chunk = flatten_nested(pd.read_json(io.BytesIO(b"".join(lines)), lines=True))
+            if fixed_columns:
+                if columns is None:
+                    columns = chunk.columns
+                else:
+                    chunk = chunk.reindex(columns=columns)
+            progress(min(int(handle.tell() * 100 / total_bytes), 99))
+            yield chunk
+
+def excel_sheet_names(file_path):
+    if file_path.lower().endswith('.xls'):
+        return pd.ExcelFile(file_path).sheet_names
+    workbook = openpyxl.load_workbook(file_path, read_only=True)
+    try:
+        return workbook.sheetnames
+    finally:
+        workbook.close()
+
+def header_names(values):
+    """Column names from a header row, named and de-duplicated the way pandas does"""
+    names, seen = [], {}
+    for i, value in enumerate(values):
+        name = f"Unnamed: {i}" if value is None else value
+        if name in seen:
+            seen[name] += 1
+            name = f"{name}.{seen[name]}"
+        seen.setdefault(name, 0)
+        names.append(name)
+    return names
+
+def records_frame(rows, columns):
+    """Frame from row tuples that may be shorter than the header, with every header column present"""
+    width = max(map(len, rows), default=len(columns))
+    return pd.DataFrame.from_records(rows, columns=columns[:width]).reindex(columns=columns)
+
+def iter_excel_chunks(file_path, sheet=None, chunk_size=50000, progress=None):
+    """Yield one worksheet as DataFrame chunks of at most chunk_size rows.
+
+    The workbook is opened read-only, so rows are parsed from the sheet XML
+    as they are iterated instead of building the whole workbook in memory.
+    Progress is reported as (rows read, rows in the sheet). Legacy .xls
+    files have no streaming reader and are read in one go.
+    """
+    progress = progress or (lambda rows, total: None)
+    if file_path.lower().endswith('.xls'):
+        df = pd.read_excel(file_path, sheet_name=sheet or 0)
+        progress(len(df), len(df))
+        yield df
+        return
+    workbook = openpyxl.load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        worksheet = workbook[sheet] if sheet else workbook.worksheets[0]
+        total_rows = max((worksheet.max_row or 1) - 1, 1)
+        rows = worksheet.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        columns = header_names(header)
+        width = len(columns)
+        buffer, rows_read = [], 0
+        for row in rows:
+            rows_read += 1
+            if all(value is None for value in row):
+                continue  # Blank rows are skipped, as in read_excel
+            if len(row) > width:
+                columns += [f"Unnamed: {i}" for i in range(width, len(row))]
+                width = len(columns)
+            buffer.append(row)
+            if len(buffer) >= chunk_size:
+                progress(rows_read, total_rows)
+                yield records_frame(buffer, columns)
+                buffer = []
+        progress(rows_read, max(total_rows, rows_read))
+        if buffer or rows_read == 0:
+            yield records_frame(buffer, columns)
+    finally:
+        workbook.close()
+
+def read_excel_sheet(file_path, sheet, chunk_size, queue=None):
+    """Read a whole worksheet through iter_excel_chunks (runs in a worker process)"""
+    report = (lambda rows, total: queue.put((sheet, rows, total))) if queue is not None else None
+    chunks = list(iter_excel_chunks(file_path, sheet, chunk_size, report))
+    return pd.concat(chunks, ignore_index=True) if chunks else pd.DataFrame()
+
+def read_excel_sheets(file_path, sheets, chunk_size, workers=1, progress=None):
+    """Read several worksheets, in parallel processes when workers > 1.
+
+    Sheets are stacked into one frame with a leading "Sheet" column.
+    """
+    report_progress = progress or (lambda value: None)
+    shown = 0
+
+    def progress(value):
+        # Row counts are estimates that can move back, so only ever advance the bar
+        nonlocal shown
+        if value > shown:
+            shown = value
+            report_progress(value)
+
+    frames = {}
+    if workers > 1 and len(sheets) > 1:
+        with multiprocessing.Manager() as manager, \
+                ProcessPoolExecutor(max_workers=min(workers, len(sheets))) as pool:
+            queue = manager.Queue()
+            futures = {pool.submit(read_excel_sheet, file_path, sheet, chunk_size, queue): sheet for sheet in sheets}
+            counts, pending = {}, set(futures)
+            while pending:
+                done = {future for future in pending if future.done()}
+                for future in done:
+                    frames[futures[future]] = future.result()
+                pending -= done
+                while not queue.empty():
+                    sheet, rows, total = queue.get()
+                    counts[sheet] = (rows, total)
+                if counts:
+                    read = sum(rows for rows, _ in counts.values())
+                    expected = sum(total for _, total in counts.values()) * len(sheets) / len(counts)
+                    progress(min(int(read * 99 / max(expected, 1)), 99))
+                if pending:
+                    time.sleep(0.05)
+    else:
+        for i, sheet in enumerate(sheets):
+            def report(rows, total, i=i):
+                progress(min(int((i + rows / max(total, 1)) * 99 / len(sheets)), 99))
+            chunks = list(iter_excel_chunks(file_path, sheet, chunk_size, report))
+            frames[sheet] = pd.concat(chunks, ignore_index=True) if chunks else pd.DataFrame()
+    if len(sheets) == 1:
+        return frames[sheets[0]]
+    return pd.concat([frames[sheet].assign(Sheet=sheet)[["Sheet", *frames[sheet].columns]] for sheet in sheets],
+                     ignore_index=True)
+
+def write_excel(df, file_path, rows_per_sheet=EXCEL_MAX_ROWS - 1, chunk_size=50000, progress=None):
+    """Write df to an .xlsx workbook with a write-only openpyxl workbook.
+
+    Rows are converted and appended one chunk at a time and openpyxl streams
+    them to disk, so memory stays bounded. Frames longer than one worksheet
+    continue on numbered sheets (Sheet1, Sheet2, ...), each with the header.
+    Returns the number of sheets written.
+    """
+    progress = progress or (lambda value: None)
+    workbook = openpyxl.Workbook(write_only=True)
+    header = [str(col) for col in df.columns]
+    total_rows = max(len(df), 1)
+    sheets = max(-(-len(df) // rows_per_sheet), 1)
+    for number in range(sheets):
+        worksheet = workbook.create_sheet(f"Sheet{number + 1}")
+        worksheet.append(header)
+        sheet_end = min((number + 1) * rows_per_sheet, len(df))
+        for start in range(number * rows_per_sheet, sheet_end, chunk_size):
+            chunk = df.iloc[start:min(start + chunk_size, sheet_end)]
+            columns = []
+            for i in range(chunk.shape[1]):
+                values = chunk.iloc[:, i].to_numpy(dtype=object)
+                missing = chunk.iloc[:, i].isna().to_numpy()
+                if missing.any():
+                    values[missing] = None
+                columns.append(values)
+            for row in zip(*columns):
+                worksheet.append(row)
+            progress(min(int((start + len(chunk)) * 99 / total_rows), 99))
+    workbook.save(file_path)
+    progress(100)
+    return sheets
+
+def csv_compression(file_path):
+    """Compression implied by a file name (data.csv.gz -> gzip), or None"""
+    return CSV_COMPRESSION_EXTENSIONS.get(os.path.splitext(file_path)[1].lower())
+
+def format_csv_chunk(chunk, header, compression=None):
+    """Render one chunk as CSV bytes, compressed as a self-contained stream (runs in a worker)"""
+    data = chunk.to_csv(index=False, header=header).encode("utf-8")
+    if compression == "gzip":
+        return gzip.compress(data, compresslevel=6)
+    if compression == "bz2":
+        return bz2.compress(data)
+    if compression == "xz":
+        return lzma.compress(data)
+    return data
+
+def write_csv_file(frame, file_path, compression=None):
+    """Write one complete CSV file (runs in a worker)"""
+    frame.to_csv(file_path, index=False, compression=compression, chunksize=50000)
+    return len(frame)
+
+def write_csv_parallel(df, output_path, workers=1, partition_by=None, shard_rows=None,
+                       chunk_size=50000, progress=None):
+    """Export df as CSV with formatting and compression spread over worker processes.
+
+    Compression follows the extension of output_path (.gz, .bz2 or .xz).
+    Without partitioning, chunks are rendered and compressed in parallel and
+    appended in order; gzip, bz2 and xz all allow a file to be a sequence of
+    complete streams. With partition_by or shard_rows, output_path names a
+    folder that gets one file per column value (Country=USA.csv.gz) or per
+    shard (part-00000.csv.gz). Returns the list of files written.
+    """
+    progress = progress or (lambda value: None)
+    compression = csv_compression(output_path)
+    total_rows = max(len(df), 1)
+    pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    run = pool.submit if pool is not None else None
+    window = deque()
+    rows_done = 0
+
+    def drain(limit):
+        nonlocal rows_done
+        while len(window) > limit:
+            rows, result = window.popleft()
+            yield result.result() if pool is not None else result
+            rows_done += rows
+            progress(min(int(rows_done * 99 / total_rows), 99))
+
+    try:
+        if partition_by is None and not shard_rows:
+            with open(output_path, 'wb') as out:
+                for start in range(0, max(len(df), 1), chunk_size):
+                    chunk = df.iloc[start:start + chunk_size]
+                    args = (chunk, start == 0, compression)
+                    window.append((len(chunk), run(format_csv_chunk, *args) if run else format_csv_chunk(*args)))
+                    for data in drain(workers * 2):
+                        out.write(data)
+                for data in drain(0):
+                    out.write(data)
+            progress(100)
+            return [output_path]
+
+        # data.csv.gz -> folder data/ holding *.csv.gz files
+        stem, extension = output_path, ""
+        if compression:
+            stem, extension = os.path.splitext(stem)
+        stem, csv_extension = os.path.splitext(stem)
+        extension = (csv_extension or ".csv") + extension
+        os.makedirs(stem, exist_ok=True)
+        if partition_by is not None:
+            groups = df.groupby(partition_by, dropna=False, sort=True, observed=True)
+            used = set()
+
+            def parts():
+                for value, frame in groups:
+                    value = value[0] if isinstance(value, tuple) else value
+                    label = "__null__" if pd.isna(value) else re.sub(r"[^\w.-]", "_", str(value))[:100]
+                    name, suffix = f"{partition_by}={label}", 1
+                    while name in used:
+                        suffix += 1
+                        name = f"{partition_by}={label}_{suffix}"
+                    used.add(name)
+                    yield name, frame
+        else:
+            def parts():
+                for i, start in enumerate(range(0, max(len(df), 1), shard_rows)):
+                    yield f"part-{i:05d}", df.iloc[start:start + shard_rows]
+        files = []
+        for name, frame in parts():
+            path = os.path.join(stem, name + extension)
+            files.append(path)
+            args = (frame, path, compression)
+            window.append((len(frame), run(write_csv_file, *args) if run else write_csv_file(*args)))
+            for _ in drain(workers * 2):
+                pass
+        for _ in drain(0):
+            pass
+        progress(100)
+        return files
+    finally:
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+
+def iter_file_chunks(file_path, file_type, chunk_size, progress=None, source_options=None):
+    """Yield a file as DataFrame chunks of at most chunk_size rows"""
+    progress = progress or (lambda value: None)
+    if file_type == "CSV":
+        total_bytes = os.path.getsize(file_path)
+        with open(file_path, 'rb') as handle:
+            reader = ProgressReader(handle, total_bytes, progress)
+            for chunk in pd.read_csv(reader, engine='c', chunksize=chunk_size):
+                yield chunk
+    elif file_type == "Excel":
+        sheets = (source_options or {}).get("sheets") or [None]
+        columns = None  # Every chunk follows the first one's columns, so streamed CSV stays rectangular
+        for i, sheet in enumerate(sheets):
+            def report(rows, total, i=i):
+                progress(min(int((i + rows / max(total, 1)) * 100 / len(sheets)), 99))
+            for chunk in iter_excel_chunks(file_path, sheet, chunk_size, report):
+                if len(sheets) > 1:
+                    chunk = chunk.assign(Sheet=sheet)[["Sheet", *chunk.columns]]
+                if columns is None:
+                    columns = chunk.columns
+                else:
+                    chunk = chunk.reindex(columns=columns)
+                yield chunk
+    elif file_type == "JSON Lines":
+        yield from iter_json_lines_chunks(file_path, chunk_size, progress, fixed_columns=True)
+    elif file_type == "Columnar":
+        df = read_columnar(file_path, mmap_mode='r', decode_dictionary=False)
+        for start in range(0, max(len(df), 1), chunk_size):  # An empty store still yields its columns
+            progress(min(int(start * 100 / max(len(df), 1)), 99))
+            yield df.iloc[start:start + chunk_size]
+    elif file_type == "SQLite":
+        yield from iter_sqlite_chunks(file_path, chunk_size, progress, source_options)
+    else:
+        raise ValueError(f"Streaming mode does not support {file_type} files")
+
+def csv_record_boundaries(file_path, parts, block_size=1 << 24):
+    """Split a CSV into at most `parts` byte ranges that start and end on record boundaries.
+
+    A newline only ends a record when the quotes before it are balanced, so
+    quoted fields that contain newlines never straddle two ranges. Returns the
+    offset where the header ends and the list of range edges after it.
+    """
+    size = os.path.getsize(file_path)
+    with open(file_path, 'rb') as handle:
+        quotes = 0  # Quote characters seen before pos
+        pos = 0
+
+        def next_boundary(target):
+            nonlocal quotes, pos
+            handle.seek(pos)
+            while pos < target:
+                block = handle.read(min(block_size, target - pos))
+                if not block:
+                    return size
+                quotes += block.count(b'"')
+                pos += len(block)
+            while True:
+                block = handle.read(block_size)
+                if not block:
+                    pos = size
+                    return size
+                start = 0
+                while True:
+                    newline = block.find(b'\n', start)
+                    if newline < 0:
+                        break
+                    quotes += block.count(b'"', start, newline)
+                    if quotes % 2 == 0:
+                        pos += newline + 1
+                        return pos
+                    start = newline + 1
+                quotes += block.count(b'"', start)
+                pos += len(block)
+
+        header_end = next_boundary(0)
+        edges = [header_end]
+        for part in range(1, parts):
+            target = header_end + (size - header_end) * part // parts
+            boundary = next_boundary(max(target, edges[-1]))
+            if edges[-1] < boundary < size:
+                edges.append(boundary)
+        if edges[-1] < size:
+            edges.append(size)
+    return header_end, edges
+
+def parse_csv_range(file_path, start, end, names, str_columns=()):
+    """Parse one headerless byte range of a CSV file (runs in a worker process)"""
+    with open(file_path, 'rb') as handle:
+        handle.seek(start)
+        data = handle.read(end - start)
+    dtype = {col: str for col in str_columns} or None
+    return pd.read_csv(io.BytesIO(data), header=None, names=names, dtype=dtype, engine='c')
+
+def read_csv_parallel(file_path, workers, progress=None):
+    """Parse a CSV with one process per byte range and assemble a single frame.
+
+    Each range guesses its own dtypes. A column that holds text in any range
+    is re-parsed as text in the ranges that guessed otherwise, as a single
+    pass would read it; the other differences (ints in one range and floats
+    in another, bools next to blanks) are reconciled by concat the same way
+    a single read reconciles them.
+    """
+    progress = progress or (lambda value: None)
+    header_end, edges = csv_record_boundaries(file_path, workers * 2)
+    with open(file_path, 'rb') as handle:
+        names = list(pd.read_csv(io.BytesIO(handle.read(header_end)), nrows=0, engine='c').columns)
+    ranges = list(zip(edges[:-1], edges[1:]))
+    if not ranges:
+        return pd.DataFrame(columns=names)
+
+    frames = [None] * len(ranges)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(parse_csv_range, file_path, start, end, names): i
+                   for i, (start, end) in enumerate(ranges)}
+        for done, future in enumerate(as_completed(futures), 1):
+            frames[futures[future]] = future.result()
+            progress(int(done * 90 / len(ranges)))
+
+        # Bools with blanks come back as object too, but they are not text
+        is_text = lambda series: series.dtype == object and \
+            pd.api.types.infer_dtype(series, skipna=True) not in ("boolean", "empty")
+        mixed = [col for col in names
+                 if any(is_text(frame[col]) for frame in frames)
+                 and not all(is_text(frame[col]) for frame in frames)]
+        if mixed:
+            reparse = [i for i, frame in enumerate(frames) if not all(is_text(frame[col]) for col in mixed)]
+            futures = {pool.submit(parse_csv_range, file_path, *ranges[i], names, mixed): i for i in reparse}
+            for future in as_completed(futures):
+                frames[futures[future]] = future.result()
+    progress(95)
+    return pd.concat(frames, ignore_index=True)
+
+DEDUPE_KEEP = ("first", "last", "none")
+
+class StreamingDeduplicator:
+    """Assigns each row a key id from a 64-bit hash of its key columns.
+
+    Seen hashes are kept as sorted numpy runs that merge as they grow, next to
+    one stored copy of each unique key, so memory is proportional to the
+    number of unique keys, not the file size. Rows whose hash matches are
+    compared with the stored key, and the rare true collisions get ids of
+    their own. keep='first' decides in one pass; 'last' and 'none' need a
+    count() pass over the same rows before keep_mask() can decide.
+    """
+
+    def __init__(self, subset=None, keep="first"):
+        if keep not in DEDUPE_KEEP:
+            raise ValueError(f"keep must be one of {', '.join(DEDUPE_KEEP)}, not '{keep}'")
+        self.subset = list(subset) if subset else None
+        self.keep = keep
+        self.runs = []
+        self.keys = {}
+        self.size = 0
+        self.collisions = {}
+        self.counts = np.zeros(0, dtype=np.int64)
+        self.last = np.zeros(0, dtype=np.int64)
+        self.counted = False
+        self.position = 0
+
+    @property
+    def needs_count(self):
+        return self.keep != "first"
+
+    def key_frame(self, chunk):
+        if self.subset is not None:
+            missing = [col for col in self.subset if col not in chunk.columns]
+            if missing:
+                raise KeyError(f"Duplicate key column '{missing[0]}' not found")
+            chunk = chunk[self.subset]
+        return chunk
+
+    def row_hashes(self, keys):
+        # Integer columns turn into floats in chunks that contain nulls, so
+        # whole-number floats hash as the integer they hold; integers
+        # themselves hash exactly, however large
+        column_hashes = {}
+        for i, col in enumerate(keys.columns):
+            series = keys.iloc[:, i]
+            if pd.api.types.is_float_dtype(series.dtype):
+                values = series.to_numpy(dtype=np.float64)
+                hashes = pd.util.hash_array(values)
+                with np.errstate(invalid='ignore'):
+                    whole = (np.floor(values) == values) & (np.abs(values) < 2.0 ** 63)
+                hashes[whole] = pd.util.hash_array(values[whole].astype(np.int64))
+            else:
+                hashes = pd.util.hash_pandas_object(series, index=False).to_numpy()
+            column_hashes[i] = hashes
+        return pd.util.hash_pandas_object(pd.DataFrame(column_hashes), index=False).to_numpy()
+
+    def key_ids(self, chunk, register=True):
+        """Key id of every row; unseen keys get the next free ids when register is True"""
+        keys = self.key_frame(chunk)
+        if not len(keys):
+            return np.zeros(0, dtype=np.int64)  # Filters upstream can empty a chunk before any key is stored
+        hashes = self.row_hashes(keys)
+        ids = np.full(len(hashes), -1, dtype=np.int64)
+        for run, run_ids in self.runs:
+            positions = np.minimum(np.searchsorted(run, hashes), len(run) - 1)
+            hit = run[positions] == hashes
+            ids[hit] = run_ids[positions[hit]]
+        new = np.flatnonzero(ids < 0)
+        if len(new):
+            if not register:
+                raise ValueError("Rows differ from the counting pass")
+            codes, uniques = pd.factorize(hashes[new])
+            first = new[np.unique(codes, return_index=True)[1]]
+            new_ids = np.arange(self.size, self.size + len(uniques), dtype=np.int64)
+            self.store_keys(keys.iloc[first])
+            self.insert(np.asarray(uniques, dtype=np.uint64), new_ids)
+            ids[new] = new_ids[codes]
+        mismatched = np.flatnonzero(~self.matches_stored(keys, ids))
+        for position in mismatched:
+            ids[position] = self.collision_id(hashes[position], keys, position, register)
+        return ids
+
+    def insert(self, hashes, ids):
+        order = np.argsort(hashes)
+        self.runs.append((hashes[order], ids[order]))
+        while len(self.runs) > 1 and len(self.runs[-2][0]) <= 2 * len(self.runs[-1][0]):
+            newest, newest_ids = self.runs.pop()
+            run, run_ids = self.runs[-1]
+            merged = np.concatenate([run, newest])
+            order = np.argsort(merged, kind='mergesort')
+            self.runs[-1] = (merged[order], np.concatenate([run_ids, newest_ids])[order])
+
+    def store_keys(self, keys):
+        """Append key rows to per-column arrays that double in capacity as they fill"""
+        end = self.size + len(keys)
+        for col in keys.columns:
+            values = keys[col].to_numpy()
+            stored = self.keys.get(col)
+            if stored is None:
+                stored = np.empty(max(end, 1024), dtype=values.dtype)
+            elif stored.dtype != values.dtype:
+                # Mixing ints and floats keeps Python numbers, so large ints stay exact
+                try:
+                    same_kind = stored.dtype.kind == values.dtype.kind
+                    dtype = np.result_type(stored.dtype, values.dtype) if same_kind else np.dtype(object)
+                except TypeError:
+                    dtype = np.dtype(object)
+                stored = stored.astype(dtype)
+            if end > len(stored):
+                grown = np.empty(max(2 * len(stored), end), dtype=stored.dtype)
+                grown[:self.size] = stored[:self.size]
+                stored = grown
+            stored[self.size:end] = values
+            self.keys[col] = stored
+        self.size = end
+
+    def matches_stored(self, keys, ids):
+        match = np.ones(len(ids), dtype=bool)
+        for col in keys.columns:
+            values = keys[col].to_numpy()
+            stored = self.keys[col][ids]
+            try:
+                if stored.dtype.kind != values.dtype.kind:
+                    raise TypeError  # e.g. int64 against float64 would compare as floats
+                equal = np.asarray(stored == values, dtype=bool)
+            except TypeError:
+                equal = np.asarray(stored.astype(object) == values.astype(object), dtype=bool)
+            match &= equal | (pd.isna(stored) & pd.isna(values))
+        return match
+
+    def collision_id(self, row_hash, keys, position, register):
+        # Different keys with the same hash: look the exact key up by value
+        row = keys.iloc[position]
+        key = tuple(None if pd.isna(value) else value for value in row.tolist())
+        entries = self.collisions.setdefault(int(row_hash), {})
+        if key not in entries:
+            if not register:
+                raise ValueError("Rows differ from the counting pass")
+            entries[key] = self.size
+            self.store_keys(keys.iloc[[position]])
+        return entries[key]
+
+    def count(self, chunk):
+        """First pass for keep='last'/'none': occurrences and last row of every key"""
+        ids = self.key_ids(chunk)
+        if len(self.counts) < self.size:
+            self.counts = np.concatenate([self.counts, np.zeros(self.size - len(self.counts), dtype=np.int64)])
+            self.last = np.concatenate([self.last, np.full(self.size - len(self.last), -1, dtype=np.int64)])
+        np.add.at(self.counts, ids, 1)
+        np.maximum.at(self.last, ids, self.position + np.arange(len(ids)))
+        self.position += len(ids)
+        self.counted = True
+
+    def restart(self):
+        """Rewind before another pass over the rows that were counted"""
+        self.position = 0
+
+    def keep_mask(self, chunk):
+        if not self.needs_count:
+            before = self.size
+            ids = self.key_ids(chunk)
+            return (ids >= before) & ~pd.Series(ids).duplicated().to_numpy()
+        if not self.counted and len(chunk):
+            raise ValueError(f"keep='{self.keep}' needs a count() pass first")
+        ids = self.key_ids(chunk, register=False)
+        positions = self.position + np.arange(len(ids))
+        self.position += len(ids)
+        if self.keep == "last":
+            return self.last[ids] == positions
+        return self.counts[ids] == 1
+
+def dedupe_mask(df, subset=None, keep="first"):
+    """Row mask that keeps the first, last or no copy of every duplicated key.
+
+    A frame in memory is deduplicated by pandas directly; the hash runs of
+    StreamingDeduplicator only pay off across chunks and files.
+    """
+    if keep not in DEDUPE_KEEP:
+        raise ValueError(f"keep must be one of {', '.join(DEDUPE_KEEP)}, not '{keep}'")
+    return ~df.duplicated(subset=list(subset) if subset else None, keep=keep if keep != "none" else False).to_numpy()
+
+class StreamingPipeline:
+    """Runs a LazyPlan chunk by chunk from source files straight to a CSV output.
+
+    file_path may be a list of files, which are streamed one after another
+    as if they were one input, so a dedupe step drops duplicates across files.
+    Fill values are precomputed with one extra pass per fill segment over the
+    rows that survive the steps before it. Numeric medians hold that single
+    column in memory; modes keep only a running value count. With a sketch
+    error bound both come from column sketches in bounded memory. A dedupe
+    that keeps the last copy or no copy first counts its keys in one extra pass.
+    """
+
+    def __init__(self, plan, file_path, file_type, chunk_size, sketch_error=None, source_options=None):
+        self.segments = plan.optimize()
+        self.source_options = source_options
+        self.sketch_error = sketch_error
+        self.file_paths = [file_path] if isinstance(file_path, str) else list(file_path)
+        self.file_type = file_type
+        self.chunk_size = chunk_size
+        self.fill_values = {}
+        self.counted_dedupers = {}
+        self.pass_index = 0
+        self.rows_in = 0
+        self.rows_out = 0
+
+    def extra_passes(self):
+        return sum((1 if segment["fill"] else 0) + (1 if self.counts_keys(segment) else 0)
+                   for segment in self.segments)
+
+    @staticmethod
+    def counts_keys(segment):
+        return segment["dedupe"] is not None and segment["dedupe"]["keep"] != "first"
+
+    def chunks(self, progress=None):
+        """Chunks of every input file in turn, with progress spread across the files"""
+        progress = progress or (lambda value: None)
+        for n, file_path in enumerate(self.file_paths):
+            file_type = self.file_type or detect_file_type(file_path)
+            report = lambda value, n=n: progress(int((n * 100 + value) / len(self.file_paths)))
+            yield from iter_file_chunks(file_path, file_type, self.chunk_size, report, self.source_options)
+
+    def process(self, chunk, dedupers, stop_before_fill=None, count_keys=None):
+        for i, segment in enumerate(self.segments):
+            keep = None
+            for condition in segment["filters"]:
+                mask = filter_mask(chunk, condition)
+                keep = mask if keep is None else keep & mask
+            if segment["dropna"]:
+                mask = chunk.notna().all(axis=1).to_numpy()
+                keep = mask if keep is None else keep & mask
+            if keep is not None:
+                chunk = chunk[keep]
+            if i == count_keys:
+                dedupers[i].count(chunk)
+                return chunk
+            if segment["dedupe"]:
+                chunk = chunk[dedupers[i].keep_mask(chunk)]
+            if i == stop_before_fill:
+                return chunk
+            if segment["fill"]:
+                chunk = chunk.fillna({column: self.fill_values[(i, column)] for column in segment["fill"]})
+        return chunk
+
+    def new_dedupers(self):
+        """Fresh keep-first dedupers for a pass, plus the counted ones rewound to the start"""
+        dedupers = {}
+        for i, segment in enumerate(self.segments):
+            if i in self.counted_dedupers:
+                dedupers[i] = self.counted_dedupers[i]
+                dedupers[i].restart()
+            elif segment["dedupe"]:
+                dedupers[i] = StreamingDeduplicator(**segment["dedupe"])
+        return dedupers
+
+    def prepare(self, progress=None):
+        """Count dedupe keys and compute fill values, one pass each for the segments that need it"""
+        self.pass_index = 0
+        self.counted_dedupers = {}
+        for i, segment in enumerate(self.segments):
+            if self.counts_keys(segment):
+                dedupers = self.new_dedupers()
+                dedupers[i] = StreamingDeduplicator(**segment["dedupe"])
+                for chunk in self.chunks(progress):
+                    self.process(chunk, dedupers, count_keys=i)
+                self.counted_dedupers[i] = dedupers[i]
+                self.pass_index += 1
+            if not segment["fill"]:
+                continue
+            dedupers = self.new_dedupers()
+            numeric_values = {column: [] for column in segment["fill"]}
+            value_counts = {column: None for column in segment["fill"]}
+            numeric = {}
+            sketches = {column: ColumnSketch(self.sketch_error) for column in segment["fill"]} \
+                if self.sketch_error is not None else None
+            for chunk in self.chunks(progress):
+                chunk = self.process(chunk, dedupers, stop_before_fill=i)
+                if sketches is not None:
+                    # Bounded memory: sketch medians and modes instead of holding the column
+                    for column in segment["fill"]:
+                        sketches[column].update(chunk[column])
+                    continue
+                for column in segment["fill"]:
+                    values = chunk[column].dropna()
+                    numeric.setdefault(column, pd.api.types.is_numeric_dtype(chunk[column]))
+                    if numeric[column]:
+                        numeric_values[column].append(values.to_numpy(dtype=np.float64))
+                    else:
+                        counts = values.value_counts()
+                        value_counts[column] = counts if value_counts[column] is None else \
+                            value_counts[column].add(counts, fill_value=0)
+            for column in segment["fill"]:
+                if sketches is not None:
+                    column_sketch = sketches[column]
+                    if column_sketch.numeric:
+                        self.fill_values[(i, column)] = column_sketch.quantile_sketch.quantiles([0.5])[0]
+                    else:
+                        mode = column_sketch.mode()
+                        self.fill_values[(i, column)] = "Unknown" if mode is None else mode
+                elif numeric.get(column):
+                    values = np.concatenate(numeric_values[column]) if numeric_values[column] else np.array([])
+                    self.fill_values[(i, column)] = np.median(values) if len(values) else np.nan
+                    numeric_values[column] = None
+                else:
+                    counts = value_counts[column]
+                    if counts is None or counts.empty:
+                        self.fill_values[(i, column)] = "Unknown"
+                    else:
+                        top = counts[counts == counts.max()].index
+                        try:
+                            top = top.sort_values()
+                        except TypeError:
+                            pass
+                        self.fill_values[(i, column)] = top[0]
+            self.pass_index += 1
+
+    def run(self, output_path, progress=None):
+        """Stream the cleaned rows to output_path as CSV"""
+        self.pass_index = self.extra_passes()
+        dedupers = self.new_dedupers()
+        first = True
+        for chunk in self.chunks(progress):
+            self.rows_in += len(chunk)
+            chunk = self.process(chunk, dedupers)
+            chunk.to_csv(output_path, mode='w' if first else 'a', header=first, index=False)
+            self.rows_out += len(chunk)
+            first = False
+        if first:
+            # The source had no rows and no header to stream; still leave the (empty) output
+            open(output_path, 'w').close()
+
+def shifted_mean_std(n, shift, total, total_sq):
+    """Mean and sample std from a count and the sum and sum of squares of (value - shift)"""
+    if not n:
+        return np.nan, np.nan
+    offset = total / n
+    if n < 2:
+        return shift + offset, np.nan
+    variance = (total_sq - total * offset) / (n - 1)
+    return shift + offset, np.sqrt(max(variance, 0.0))
+
+class ColumnStats:
+    """Per-column aggregates that follow the operation journal.
+
+    Each column keeps count, sum and sum of squares (both taken about a
+    reference value fixed when the column is first computed, so large
+    values such as timestamps do not cancel), min, max, null count,
+    distinct values and memory. Row removals subtract the removed rows and
+    undo adds them back, so only min/max (when an extreme value left),
+    distinct counts of very high-cardinality columns and quartiles are
+    recomputed, and only for the columns that need them. Fills drop the
+    filled column and renames move its entry.
+    """
+
+    def __init__(self):
+        self.columns = {}
+
+    def clear(self):
+        self.columns = {}
+
+    def get(self, df, column, quartiles=False):
+        """Aggregates for one column, computing whatever is missing"""
+        stats = self.columns.get(column)
+        series = df[column]
+        if stats is None:
+            stats = self.columns[column] = self._compute(series)
+        if stats["numeric"] and stats["min"] is None and stats["count"]:
+            stats["min"], stats["max"] = series.min(), series.max()
+        if not stats["numeric"] and stats["distinct"] is None:
+            stats["distinct"] = int(series.nunique())
+        if stats["memory"] is None:
+            stats["memory"] = int(series.memory_usage(deep=True, index=False))
+        if quartiles and stats["quartiles"] is None:
+            stats["quartiles"] = series.quantile([0.25, 0.5, 0.75]).tolist()
+        return stats
+
+    def _compute(self, series):
+        nulls = int(series.isna().sum())
+        numeric = pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series)
+        stats = {
+            "numeric": numeric, "count": len(series) - nulls, "nulls": nulls,
+            "shift": 0.0, "sum": 0.0, "sumsq": 0.0, "min": None, "max": None,
+            "counts": None, "distinct": None, "quartiles": None, "memory": None,
+        }
+        if numeric:
+            values = series.dropna().to_numpy(dtype=np.float64)
+            if len(values):
+                stats["shift"] = float(values.mean())
+            values = values - stats["shift"]
+            stats["sum"] = float(values.sum())
+            stats["sumsq"] = float(np.dot(values, values))
+            if len(values):
+                stats["min"], stats["max"] = series.min(), series.max()
+        else:
+            counts = series.value_counts()
+            counts = counts[counts > 0]
+            if len(counts) <= DISTINCT_TRACK_LIMIT:
+                stats["counts"] = counts
+            stats["distinct"] = len(counts)
+        return stats
+
+    def apply_change(self, kind, rows=None, column=None, new_name=None):
+        """Update aggregates after a journal change"""
+        if kind == "column_changed":
+            self.columns.pop(column, None)
+        elif kind == "column_renamed":
+            if column in self.columns:
+                self.columns[new_name] = self.columns.pop(column)
+        else:
+            sign = -1 if kind == "rows_removed" else 1
+            for name in list(self.columns):
+                if name in rows.columns:
+                    self._update_rows(self.columns[name], rows[name], sign)
+                else:
+                    del self.columns[name]
+
+    def _update_rows(self, stats, part, sign):
+        nulls = int(part.isna().sum())
+        stats["nulls"] += sign * nulls
+        stats["count"] += sign * (len(part) - nulls)
+        stats["quartiles"] = None
+        if isinstance(part.dtype, pd.CategoricalDtype) or stats["memory"] is None:
+            stats["memory"] = None
+        else:
+            stats["memory"] += sign * int(part.memory_usage(deep=True, index=False))
+        if stats["numeric"]:
+            values = part.dropna().to_numpy(dtype=np.float64) - stats["shift"]
+            stats["sum"] += sign * float(values.sum())
+            stats["sumsq"] += sign * float(np.dot(values, values))
+            if not len(values) or stats["min"] is None:
+                return
+            part_min, part_max = part.min(), part.max()
+            if sign < 0 and (part_min <= stats["min"] or part_max >= stats["max"]):
+                stats["min"] = stats["max"] = None  # An extreme left; recompute on demand
+            elif sign > 0:
+                stats["min"], stats["max"] = min(stats["min"], part_min), max(stats["max"], part_max)
+        elif stats["counts"] is not None:
+            counts = stats["counts"].add(sign * part.value_counts(), fill_value=0)
+            stats["counts"] = counts[counts > 0].astype(np.int64)
+            stats["distinct"] = len(stats["counts"])
+        else:
+            stats["distinct"] = None
+
+class HyperLogLog:
+    """Distinct-count sketch; relative error is about 1.04 / sqrt(2 ** precision)"""
+
+    def __init__(self, error_bound=0.01):
+        self.precision = int(min(max(np.ceil(np.log2((1.04 / error_bound) ** 2)), 4), 18))
+        self.registers = np.zeros(1 << self.precision, dtype=np.uint8)
+
+    def update_hashes(self, hashes):
+        if not len(hashes):
+            return
+        p = self.precision
+        index = (hashes >> np.uint64(64 - p)).astype(np.intp)
+        rest = hashes << np.uint64(p)
+        # Rank = leading zeros of the remaining bits + 1, found by halving
+        rank = np.ones(len(hashes), dtype=np.uint8)
+        for shift in (32, 16, 8, 4, 2, 1):
+            empty = (rest >> np.uint64(64 - shift)) == 0
+            rank += empty.astype(np.uint8) * shift
+            rest = np.where(empty, rest << np.uint64(shift), rest)
+        rank = np.minimum(rank, 64 - p + 1)
+        best = pd.Series(rank).groupby(index).max()
+        positions = best.index.to_numpy()
+        self.registers[positions] = np.maximum(self.registers[positions], best.to_numpy())
+
+    def estimate(self):
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        raw = alpha * m * m / np.sum(np.ldexp(1.0, -self.registers.astype(np.int64)))
+        zeros = np.count_nonzero(self.registers == 0)
+        if zeros:
+            linear = m * np.log(m / zeros)
+            if linear <= 2.5 * m:
+                return int(round(linear))  # Linear counting is more accurate for small sets
+        return int(round(raw))
+
+class QuantileSketch:
+    """KLL-style compactor sketch for approximate quantiles of numeric values.
+
+    Each level holds at most ``capacity`` items of weight 2 ** level; a full
+    level is sorted and every other item (random offset) is promoted, which
+    keeps memory at O(capacity * log n).
+    """
+
+    def __init__(self, error_bound=0.01, seed=0):
+        self.capacity = int(max(np.ceil(2.0 / error_bound), 16))
+        self.levels = [np.empty(0, dtype=np.float64)]
+        self.rng = np.random.default_rng(seed)
+
+    def update(self, values):
+        self.levels[0] = np.concatenate([self.levels[0], values])
+        level = 0
+        while level < len(self.levels):
+            items = self.levels[level]
+            if len(items) > self.capacity:
+                items = np.sort(items)
+                keep = items[-1:] if len(items) % 2 else items[:0]
+                body = items[:len(items) - len(keep)]
+                promoted = body[self.rng.integers(2)::2]
+                self.levels[level] = keep
+                if level + 1 == len(self.levels):
+                    self.levels.append(np.empty(0, dtype=np.float64))
+                self.levels[level + 1] = np.concatenate([self.levels[level + 1], promoted])
+            level += 1
+
+    def quantiles(self, qs):
+        values = np.concatenate(self.levels)
+        if not len(values):
+            return [np.nan for _ in qs]
+        weights = np.concatenate([np.full(len(items), 2.0 ** level) for level, items in enumerate(self.levels)])
+        order = np.argsort(values, kind='mergesort')
+        values, cumulative = values[order], np.cumsum(weights[order])
+        targets = np.asarray(qs) * cumulative[-1]
+        return values[np.minimum(np.searchsorted(cumulative, targets), len(values) - 1)].tolist()
+
+class HeavyHitters:
+    """Misra-Gries summary; counts are underestimated by at most n * error_bound"""
+
+    def __init__(self, error_bound=0.01):
+        self.size = int(np.ceil(1.0 / error_bound))
+        self.counts = pd.Series(dtype=np.int64)
+
+    def update(self, series):
+        counts = self.counts.add(series.value_counts(), fill_value=0)
+        counts = counts[counts > 0]
+        if len(counts) > self.size:
+            # Mergeable Misra-Gries: subtract the (size + 1)-th largest count
+            threshold = counts.nlargest(self.size + 1).iloc[-1]
+            counts = counts[counts > threshold] - threshold
+        self.counts = counts.astype(np.int64)
+
+    def top(self, n=20):
+        return self.counts.sort_values(ascending=False, kind='mergesort').head(n)
+
+class ColumnSketch:
+    """Exact counts/sums/extremes plus HLL, quantile and heavy-hitter sketches for one column"""
+
+    def __init__(self, error_bound):
+        self.error_bound = error_bound
+        self.count = 0
+        self.nulls = 0
+        self.numeric = None
+        self.shift = None  # Sums are taken about the first chunk's mean so large values do not cancel
+        self.sum = 0.0
+        self.sumsq = 0.0
+        self.min = None
+        self.max = None
+        self.distinct = HyperLogLog(error_bound)
+        self.quantile_sketch = QuantileSketch(error_bound)
+        self.heavy_hitters = HeavyHitters(error_bound)
+
+    def update(self, series):
+        values = series.dropna()
+        self.nulls += len(series) - len(values)
+        self.count += len(values)
+        is_numeric = pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series)
+        self.numeric = is_numeric if self.numeric is None else self.numeric and is_numeric
+        if not len(values):
+            return
+        if is_numeric:
+            numbers = values.to_numpy(dtype=np.float64)
+            if self.shift is None:
+                self.shift = float(numbers.mean())
+            shifted = numbers - self.shift
+            self.sum += float(shifted.sum())
+            self.sumsq += float(np.dot(shifted, shifted))
+            low, high = numbers.min(), numbers.max()
+            self.min = low if self.min is None else min(self.min, low)
+            self.max = high if self.max is None else max(self.max, high)
+            self.quantile_sketch.update(numbers)
+            values = pd.Series(numbers)  # Hash ints and floats alike across chunks
+        self.distinct.update_hashes(pd.util.hash_pandas_object(values, index=False).to_numpy())
+        self.heavy_hitters.update(values)
+
+    def mode(self):
+        top = self.heavy_hitters.top(1)
+        return top.index[0] if len(top) else None
+
+class DatasetSketch:
+    """Per-column sketches built in one streaming pass over a frame or its chunks"""
+
+    def __init__(self, error_bound=0.01):
+        self.error_bound = error_bound
+        self.rows = 0
+        self.columns = {}
+
+    def update(self, df, executor=None):
+        self.rows += len(df)
+        for col in df.columns:
+            if col not in self.columns:
+                self.columns[col] = ColumnSketch(self.error_bound)
+        if executor is None:
+            for col in df.columns:
+                self.columns[col].update(df[col])
+        else:
+            # Column sketches are independent, so each column can go to its own worker
+            list(executor.map(lambda col: self.columns[col].update(df[col]), df.columns))
+        return self
+
+def parallel_value_counts(series, executor, blocks):
+    """value_counts over row blocks in parallel, merged into one sorted Series"""
+    step = max(-(-len(series) // max(blocks, 1)), 1)
+    parts = [series.iloc[start:start + step] for start in range(0, len(series), step)]
+    partials = list(executor.map(lambda part: part.value_counts(), parts))
+    if not partials:
+        return series.value_counts()
+    counts = partials[0]
+    for partial in partials[1:]:
+        counts = counts.add(partial, fill_value=0)
+    counts = counts[counts > 0].astype(np.int64)
+    return counts.sort_values(ascending=False, kind='mergesort')
+
+def parallel_corr(numeric_df, executor):
+    """Pearson correlation with pairwise-complete observations, one matrix row per task"""
+    values = numeric_df.to_numpy(dtype=np.float64, na_value=np.nan)
+    valid = ~np.isnan(values)
+    k = values.shape[1]
+    complete = bool(valid.all())
+    if complete:
+        centered = values - values.mean(axis=0)
+        norms = np.sqrt(np.einsum('ij,ij->j', centered, centered))
+
+    def corr_row(i):
+        row = np.full(k, np.nan)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            if complete:
+                row[i:] = centered[:, i] @ centered[:, i:] / (norms[i] * norms[i:])
+                return row
+            for j in range(i, k):
+                both = valid[:, i] & valid[:, j]
+                x = values[both, i] - values[both, i].mean() if both.any() else values[both, i]
+                y = values[both, j] - values[both, j].mean() if both.any() else values[both, j]
+                denom = np.sqrt(np.dot(x, x) * np.dot(y, y))
+                row[j] = np.dot(x, y) / denom if denom else np.nan
+        return row
+
+    matrix = np.vstack(list(executor.map(corr_row, range(k))))
+    upper = np.triu_indices(k, 1)
+    matrix[(upper[1], upper[0])] = matrix[upper]
+    return pd.DataFrame(np.clip(matrix, -1.0, 1.0), index=numeric_df.columns, columns=numeric_df.columns)
+
+class JobCancelled(Exception):
+    """Raised inside a job once it has been cancelled"""
+
+class Job:
+    """A named unit of background work; func(job) runs on the scheduler thread.
+
+    Long-running jobs call check() or progress() between steps; both raise
+    JobCancelled after cancel(). on_done and on_error run on the UI thread.
+    While it runs, func may add rows_in, rows_out, bytes_read and
+    bytes_written to job.metrics for the performance trace.
+    """
+
+    def __init__(self, name, func, on_done=None, on_error=None, stop_queue_on_error=False, category="analysis"):
+        self.name = name
+        self.category = category
+        self.metrics = {}
+        self.func = func
+        self.on_done = on_done
+        self.on_error = on_error
+        self.stop_queue_on_error = stop_queue_on_error
+        self.started_at = None
+        self.report = lambda value: None
+        self._cancel = threading.Event()
+
+    def cancel(self):
+        self._cancel.set()
+
+    def cancelled(self):
+        return self._cancel.is_set()
+
+    def check(self):
+        if self._cancel.is_set():
+            raise JobCancelled()
+
+    def progress(self, value):
+        """Report progress from 0 to 100; also a cancellation point"""
+        self.check()
+        self.report(int(value))
+
+def peak_rss():
+    """Peak resident set size of this process in bytes, or None where it is not available"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024  # Linux reports kilobytes
+
+class PerformanceTrace:
+    """Per-operation metrics for a session, exportable as JSON or Chrome trace events.
+
+    Each span records wall and CPU time, how far the process peak RSS rose,
+    and rows and bytes in and out as the operation reports them. Peak
+    traced memory is only measured while trace_memory is on, because
+    tracemalloc slows every allocation. CPU time covers all threads of this
+    process but not worker processes.
+    """
+
+    def __init__(self, trace_memory=False):
+        self.started = time.time()
+        self.origin = time.perf_counter()
+        self.records = []
+        self.trace_memory = False
+        self._lock = threading.Lock()
+        if trace_memory:
+            self.set_trace_memory(True)
+
+    def set_trace_memory(self, enabled):
+        self.trace_memory = bool(enabled)
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        elif not self.trace_memory and tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+    def clear(self):
+        with self._lock:
+            self.records = []
+
+    @contextlib.contextmanager
+    def span(self, name, category, **metrics):
+        """Time the body; the yielded dict takes rows_in, rows_out, bytes_read and bytes_written"""
+        record = dict(metrics)
+        tracing = self.trace_memory and tracemalloc.is_tracing()
+        if tracing:
+            if hasattr(tracemalloc, "reset_peak"):
+                tracemalloc.reset_peak()
+            else:
+                tracemalloc.clear_traces()
+            traced_base = tracemalloc.get_traced_memory()[0]
+        rss_before = peak_rss()
+        start, cpu_start = time.perf_counter(), time.process_time()
+        status = "ok"
+        try:
+            yield record
+        except JobCancelled:
+            status = "cancelled"
+            raise
+        except Exception:
+            status = "error"
+            raise
+        finally:
+            wall = time.perf_counter() - start
+            rss_after = peak_rss()
+            record.update(
+                name=name, category=category, status=status,
+                thread=threading.current_thread().name, thread_id=threading.get_ident(),
+                start_s=start - self.origin, wall_s=wall, cpu_s=time.process_time() - cpu_start,
+                traced_peak_bytes=tracemalloc.get_traced_memory()[1] - traced_base if tracing else None,
+                rss_peak_delta_bytes=rss_after - rss_before if rss_before is not None else None,
+            )
+            with self._lock:
+                self.records.append(record)
+
+    def to_frame(self):
+        """One display row per operation, newest first"""
+        mb = 1024 * 1024
+        rows = []
+        for record in reversed(self.records):
+            rows_in, rows_out = record.get("rows_in"), record.get("rows_out")
+            rows.append({
+                "Operation": record["name"], "Category": record["category"], "Status": record["status"],
+                "Wall (s)": round(record["wall_s"], 3), "CPU (s)": round(record["cpu_s"], 3),
+                "Traced peak (MB)": None if record["traced_peak_bytes"] is None else
+                round(record["traced_peak_bytes"] / mb, 1),
+                "RSS peak Δ (MB)": None if record["rss_peak_delta_bytes"] is None else
+                round(record["rss_peak_delta_bytes"] / mb, 1),
+                "Rows in": None if rows_in is None else f"{rows_in:,}",
+                "Rows out": None if rows_out is None else f"{rows_out:,}",
+                "Read (MB)": None if record.get("bytes_read") is None else round(record["bytes_read"] / mb, 1),
+                "Written (MB)": None if record.get("bytes_written") is None else
+                round(record["bytes_written"] / mb, 1),
+                "Rows/s": round((rows_in or rows_out or 0) / record["wall_s"]) if record["wall_s"] > 0 else None,
+            })
+        return pd.DataFrame(rows).astype(object).fillna("") if rows else pd.DataFrame()
+
+    def to_json(self):
+        return {"started": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(self.started)),
+                "pid": os.getpid(), "records": list(self.records)}
+
+    def to_chrome_trace(self):
+        """Trace events for chrome://tracing and Perfetto: one complete event per operation"""
+        pid = os.getpid()
+        events, threads = [], {}
+        for record in self.records:
+            threads[record["thread_id"]] = record["thread"]
+            args = {key: value for key, value in record.items()
+                    if key not in ("name", "category", "thread", "thread_id", "start_s", "wall_s")}
+            events.append({
+                "name": record["name"], "cat": record["category"], "ph": "X", "pid": pid,
+                "tid": record["thread_id"], "ts": record["start_s"] * 1e6, "dur": record["wall_s"] * 1e6, "args": args,
+            })
+        for tid, thread in threads.items():
+            events.append({"name": "thread_name", "ph": "M", "pid": pid, "tid": tid, "args": {"name": thread}})
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def save(self, file_path, chrome=False):
+        with open(file_path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_chrome_trace() if chrome else self.to_json(), f, indent=None if chrome else 2)
+
+FILE_TYPE_EXTENSIONS = {
+    ".csv": "CSV", ".xlsx": "Excel", ".xls": "Excel", ".json": "JSON", ".jsonl": "JSON Lines",
+    ".ndjson": "JSON Lines", ".db": "SQLite", ".sqlite": "SQLite", ".sqlite3": "SQLite", ".dpc": "Columnar",
+}
+PIPELINE_STEPS = {"dropna": (), "dedupe": (), "filter": ("condition",), "fill": ("column",),
+                  "rename": ("column", "new_name")}
+
+def detect_file_type(file_path):
+    """File type name for a path, from its extension"""
+    extension = os.path.splitext(file_path.rstrip("/\\"))[1].lower()
+    if extension not in FILE_TYPE_EXTENSIONS:
+        raise ValueError(f"Cannot tell the file type of '{os.path.basename(file_path)}'")
+    return FILE_TYPE_EXTENSIONS[extension]
+
+def load_data(file_path, file_type, chunk_size=50000, compact_mode=False, cache=None, workers=1,
+              source_options=None, progress=None, metrics=None):
+    """Load a whole file into one DataFrame.
+
+    Returns (df, message, memory_saved). cache, if given, is a LoadCache that
+    is checked before reading and filled afterwards. metrics, if given, gets
+    bytes_read and rows_out.
+    """
+    progress = progress or (lambda value: None)
+    metrics = {} if metrics is None else metrics
+    cache_key = None
+    if cache is not None and cache.fits(path_size(file_path)):
+        cache_key = cache.key(file_path, {"file_type": file_type, "compact_mode": compact_mode,
+                                          "source_options": source_options})
+        cached = cache.get(cache_key)
+        if cached is not None:
+            df, extra = cached
+            metrics.update(bytes_read=path_size(os.path.join(cache.cache_dir, cache_key)), rows_out=len(df))
+            progress(100)
+            return df, f"Cached load: {len(df):,} rows and {len(df.columns)} columns", extra.get("memory_saved", 0)
+
+    load_message = "Fast load"
+    if (file_type == "CSV" and workers > 1
+            and os.path.getsize(file_path) >= PARALLEL_CSV_MIN_MB * 1024 * 1024):
+        # Large files are split on record boundaries and parsed on all cores
+        df = read_csv_parallel(file_path, workers, progress)
+
+    elif file_type == "CSV":
+        # Single streaming pass: the C parser pulls bytes through a
+        # counting reader, so progress tracks bytes consumed and the
+        # parser builds the final frame column by column without a
+        # second full set of chunk frames alive.
+        total_bytes = os.path.getsize(file_path)
+        with open(file_path, 'rb') as handle:
+            reader = ProgressReader(handle, total_bytes, progress)
+            df = pd.read_csv(reader, engine='c')
+
+    elif file_type == "Excel":
+        # Read-only workbooks, one process per sheet when several are selected
+        sheets = (source_options or {}).get("sheets") or [None]
+        df = read_excel_sheets(file_path, sheets, chunk_size, workers, progress)
+
+    elif file_type == "JSON":
+        df = pd.read_json(file_path)
+
+    elif file_type == "JSON Lines":
+        chunks = list(iter_json_lines_chunks(file_path, chunk_size, progress))
+        df = pd.concat(chunks, ignore_index=True) if chunks else pd.DataFrame()
+        del chunks
+
+    elif file_type == "Columnar":
+        # Numeric columns stay memory-mapped; strings stay dictionary-encoded
+        df = read_columnar(file_path, mmap_mode='r', decode_dictionary=False)
+
+    elif file_type == "SQLite":
+        # Only the chosen columns and matching rows leave the database
+        report = {}
+        chunks = list(iter_sqlite_chunks(file_path, chunk_size, progress, source_options, report))
+        df = pd.concat(chunks, ignore_index=True) if chunks else pd.DataFrame()
+        del chunks
+        if report.get("pushed_down"):
+            load_message = f"SQLite load from '{report['table']}' with the filter pushed down to SQL"
+        elif (source_options or {}).get("condition"):
+            load_message = f"SQLite load from '{report['table']}' with the filter applied while loading"
+        else:
+            load_message = f"SQLite load from '{report['table']}'"
+
+    else:
+        raise ValueError(f"Unsupported file type: {file_type}")
+
+    memory_saved = 0
+    if compact_mode:
+        df, memory_saved = compact_dataframe(df)
+
+    if cache_key is not None:
+        cache.put(cache_key, df, {"memory_saved": memory_saved})
+
+    metrics.update(bytes_read=path_size(file_path), rows_out=len(df))
+    progress(100)
+    return df, f"{load_message}: {len(df):,} rows and {len(df.columns)} columns", memory_saved
+
+def apply_steps(df, steps, journal=None):
+    """Run pipeline steps (dropna, dedupe, filter, fill, rename) against df.
+
+    Cleaning steps between renames run as fused LazyPlan passes. Without a
+    journal nothing is kept for undo.
+    """
+    journal = journal or OperationJournal(keep_history=False)
+    plan = LazyPlan()
+    for step in steps:
+        params = {key: value for key, value in step.items() if key != "op"}
+        if step["op"] == "rename":
+            df = plan.run(df, journal)
+            label = f"Rename '{params['column']}' to '{params['new_name']}'"
+            df = journal.rename_column(df, params["column"], params["new_name"], label)
+        else:
+            plan.add(step["op"], **params)
+    return plan.run(df, journal)
+
+def export_data(df, output_path, workers=1, partition_by=None, shard_rows=None, table="cleaned_data",
+                progress=None):
+    """Write df in the format output_path's extension names; returns the files written"""
+    lower = output_path.lower()
+    if lower.endswith('.xlsx'):
+        write_excel(df, output_path, progress=progress)
+    elif lower.endswith('.dpc'):
+        write_columnar(df.reset_index(drop=True), output_path)
+    elif lower.endswith(('.db', '.sqlite', '.sqlite3')):
+        write_sqlite(df, output_path, table, progress=progress)
+    else:
+        return write_csv_parallel(df, output_path, workers, partition_by, shard_rows, progress=progress)
+    return [output_path]
+
+def statistics_report(df, column_stats, executor=None, memory_saved=0):
+    """Statistics report from per-column aggregates, computed in parallel when an executor is given"""
+    numeric_cols = df.select_dtypes(include=[np.number]).columns
+    numeric_set = set(numeric_cols)
+    # Fan the columns out to the worker pool; the report then reads the cache
+    list((executor.map if executor is not None else map)(
+        lambda col: column_stats.get(df, col, quartiles=col in numeric_set), df.columns
+    ))
+
+    stats_text = "📊 FAST STATISTICS\n" + "="*50 + "\n\n"
+
+    # Fast basic info
+    stats_text += f"📋 Dataset Info:\n"
+    stats_text += f"   • Rows: {len(df):,}\n"
+    stats_text += f"   • Columns: {len(df.columns)}\n"
+    # Per-column aggregates are reused across steps; only
+    # columns touched since the last report are recomputed
+    aggregates = {col: column_stats.get(df, col) for col in df.columns}
+    memory = df.index.memory_usage() + sum(stats["memory"] for stats in aggregates.values())
+    stats_text += f"   • Memory: {memory / (1024*1024):.2f} MB\n"
+    if memory_saved > 0:
+        stats_text += f"   • Compact mode saved: {memory_saved / (1024*1024):.2f} MB\n"
+    stats_text += "\n"
+
+    # Fast null analysis
+    null_counts = {col: stats["nulls"] for col, stats in aggregates.items() if stats["nulls"] > 0}
+    if null_counts:
+        stats_text += f"🔍 Null Values:\n"
+        for col, count in null_counts.items():
+            stats_text += f"   • {col}: {count:,} ({count/len(df)*100:.1f}%)\n"
+        stats_text += "\n"
+
+    # Fast numeric stats
+    if len(numeric_cols) > 0:
+        stats_text += f"📈 Numeric Statistics:\n"
+        summary = {}
+        for col in numeric_cols:
+            stats = column_stats.get(df, col, quartiles=True)
+            n = stats["count"]
+            mean, std = shifted_mean_std(n, stats["shift"], stats["sum"], stats["sumsq"])
+            summary[col] = [
+                n, mean, std, stats["min"] if n else np.nan, *stats["quartiles"], stats["max"] if n else np.nan,
+            ]
+        index = ["count", "mean", "std", "min", "25%", "50%", "75%", "max"]
+        stats_text += pd.DataFrame(summary, index=index, dtype=float).to_string()
+        stats_text += "\n\n"
+
+    # Fast categorical stats
+    categorical_cols = df.select_dtypes(include=['object', 'category']).columns
+    if len(categorical_cols) > 0:
+        stats_text += f"📝 Categorical Columns:\n"
+        for col in categorical_cols:
+            unique_count = aggregates[col]["distinct"]
+            stats_text += f"   • {col}: {unique_count:,} unique values\n"
+    return stats_text
+
+def approximate_statistics_report(sketch, df=None):
+    """Statistics report built from column sketches; df adds the in-memory size"""
+    stats_text = f"📊 APPROXIMATE STATISTICS (±{sketch.error_bound * 100:g}%)\n" + "="*50 + "\n\n"
+    stats_text += f"📋 Dataset Info:\n"
+    stats_text += f"   • Rows: {sketch.rows:,}\n"
+    stats_text += f"   • Columns: {len(sketch.columns)}\n"
+    if df is not None:
+        stats_text += f"   • Memory: {df.memory_usage(deep=True).sum() / (1024*1024):.2f} MB\n"
+    stats_text += "\n"
+
+    null_counts = {col: column.nulls for col, column in sketch.columns.items() if column.nulls > 0}
+    if null_counts:
+        stats_text += f"🔍 Null Values:\n"
+        for col, count in null_counts.items():
+            stats_text += f"   • {col}: {count:,} ({count/sketch.rows*100:.1f}%)\n"
+        stats_text += "\n"
+
+    summary = {}
+    for col, column in sketch.columns.items():
+        if not column.numeric:
+            continue
+        n = column.count
+        mean, std = shifted_mean_std(n, column.shift or 0.0, column.sum, column.sumsq)
+        summary[col] = [
+            n, mean, std, column.min if n else np.nan, *column.quantile_sketch.quantiles([0.25, 0.5, 0.75]),
+            column.max if n else np.nan,
+        ]
+    if summary:
+        stats_text += f"📈 Numeric Statistics (quartiles approximate):\n"
+        index = ["count", "mean", "std", "min", "25%", "50%", "75%", "max"]
+        stats_text += pd.DataFrame(summary, index=index, dtype=float).to_string()
+        stats_text += "\n\n"
+
+    categorical = [col for col, column in sketch.columns.items() if not column.numeric]
+    if categorical:
+        stats_text += f"📝 Categorical Columns:\n"
+        for col in categorical:
+            stats_text += f"   • {col}: ≈{sketch.columns[col].distinct.estimate():,} unique values\n"
+    return stats_text
+
+def load_pipeline_spec(file_path):
+    """Read and check a JSON pipeline spec.
+
+    {"input": {"pattern", "file_type", "chunk_size", "compact_mode", "source_options"},
+     "steps": [{"op": "dropna"}, {"op": "filter", "condition": "Age > 30"},
+               {"op": "dedupe", "subset": ["Name"], "keep": "last"}, ...],
+     "output": {"format", "partition_by", "shard_rows", "table", "name"},
+     "streaming": false,
+     "combine": false}
+    """
+    with open(file_path, 'r', encoding='utf-8') as f:
+        spec = json.load(f)
+    spec.setdefault("input", {})
+    spec.setdefault("steps", [])
+    spec.setdefault("output", {})
+    for i, step in enumerate(spec["steps"]):
+        op = step.get("op")
+        if op not in PIPELINE_STEPS:
+            raise ValueError(f"Step {i + 1}: unknown operation '{op}'")
+        missing = [key for key in PIPELINE_STEPS[op] if key not in step]
+        if missing:
+            raise ValueError(f"Step {i + 1} ({op}): missing '{missing[0]}'")
+        if op == "dedupe" and step.get("keep", "first") not in DEDUPE_KEEP:
+            raise ValueError(f"Step {i + 1} (dedupe): keep must be one of {', '.join(DEDUPE_KEEP)}")
+    output_format = spec["output"].setdefault("format", "csv").lstrip(".")
+    spec["output"]["format"] = output_format
+    if spec.get("streaming"):
+        # Streaming appends plain CSV chunk by chunk and cannot rename mid-stream
+        if output_format != "csv":
+            raise ValueError("Streaming pipelines write plain CSV only")
+        if any(step["op"] == "rename" for step in spec["steps"]):
+            raise ValueError("Streaming pipelines cannot rename columns")
+    elif spec.get("combine"):
+        raise ValueError("Combining inputs into one output needs a streaming pipeline")
+    return spec
+
+def batch_inputs(input_path, pattern=None):
+    """Files (and columnar store folders) under input_path that a batch should process"""
+    if os.path.isfile(input_path):
+        return [input_path]
+    root = pathlib.Path(input_path)
+    if not root.is_dir():
+        raise ValueError(f"'{input_path}' is not a file or directory")
+    if pattern:
+        return sorted(str(path) for path in root.glob(pattern))
+    return sorted(str(path) for path in root.iterdir() if path.suffix.lower() in FILE_TYPE_EXTENSIONS)
+
+def batch_output_path(input_path, output_dir, output_format):
+    stem = os.path.splitext(os.path.basename(input_path.rstrip("/\\")))[0]
+    output_path = os.path.join(output_dir, f"{stem}.{output_format}")
+    if os.path.abspath(output_path) == os.path.abspath(input_path):
+        raise ValueError("Output would overwrite the input file; choose another output directory or format")
+    return output_path
+
+def path_size(path):
+    """Size in bytes of a file, or of everything inside a folder"""
+    if os.path.isdir(path):
+        return sum(entry.stat().st_size for entry in pathlib.Path(path).rglob("*") if entry.is_file())
+    return os.path.getsize(path)
+
+def process_file(input_path, spec, output_dir):
+    """Load one input, run the spec's steps and write the result; returns per-file throughput"""
+    start = time.perf_counter()
+    source, output = spec["input"], spec["output"]
+    file_type = source.get("file_type") or detect_file_type(input_path)
+    chunk_size = source.get("chunk_size", 50000)
+    output_path = batch_output_path(input_path, output_dir, output["format"])
+    if spec.get("streaming"):
+        # Bounded memory: the file is streamed through the plan chunk by chunk
+        plan = LazyPlan()
+        plan.steps = [dict(step) for step in spec["steps"]]
+        pipeline = StreamingPipeline(plan, input_path, file_type, chunk_size,
+                                     source_options=source.get("source_options"))
+        pipeline.prepare()
+        pipeline.run(output_path)
+        rows_in, rows_out, files = pipeline.rows_in, pipeline.rows_out, [output_path]
+    else:
+        df, _, _ = load_data(input_path, file_type, chunk_size, source.get("compact_mode", False),
+                             source_options=source.get("source_options"))
+        rows_in = len(df)
+        df = apply_steps(df, spec["steps"])
+        rows_out = len(df)
+        files = export_data(df, output_path, partition_by=output.get("partition_by"),
+                            shard_rows=output.get("shard_rows"), table=output.get("table", "cleaned_data"))
+    seconds = max(time.perf_counter() - start, 1e-9)
+    input_mb = path_size(input_path) / (1024 * 1024)
+    return {
+        "input": input_path, "output": files, "rows_in": rows_in, "rows_out": rows_out,
+        "seconds": seconds, "input_mb": input_mb, "mb_per_s": input_mb / seconds, "rows_per_s": rows_in / seconds,
+    }
+
+def process_combined(inputs, spec, output_dir):
+    """Stream every input through one pipeline into a single CSV, so dedupe steps work across files"""
+    start = time.perf_counter()
+    source, output = spec["input"], spec["output"]
+    output_path = os.path.join(output_dir, f"{output.get('name', 'combined')}.{output['format']}")
+    if any(os.path.abspath(output_path) == os.path.abspath(input_path) for input_path in inputs):
+        raise ValueError("Output would overwrite an input file; choose another output directory or name")
+    plan = LazyPlan()
+    plan.steps = [dict(step) for step in spec["steps"]]
+    pipeline = StreamingPipeline(plan, inputs, source.get("file_type"), source.get("chunk_size", 50000),
+                                 source_options=source.get("source_options"))
+    pipeline.prepare()
+    pipeline.run(output_path)
+    seconds = max(time.perf_counter() - start, 1e-9)
+    input_mb = sum(path_size(input_path) for input_path in inputs) / (1024 * 1024)
+    return {
+        "input": f"{len(inputs)} files", "output": [output_path], "rows_in": pipeline.rows_in,
+        "rows_out": pipeline.rows_out, "seconds": seconds, "input_mb": input_mb, "mb_per_s": input_mb / seconds,
+        "rows_per_s": pipeline.rows_in / seconds,
+    }
+
+def process_file_safely(input_path, spec, output_dir):
+    # One bad input should not stop the rest of the batch
+    try:
+        return process_file(input_path, spec, output_dir)
+    except Exception as e:
+        return {"input": input_path, "error": f"{type(e).__name__}: {e}"}
+
+def run_batch(spec, inputs, output_dir, workers=1):
+    """Process every input with the spec, one file per worker process; yields results as files finish.
+
+    With "combine" set, all inputs stream through one pipeline into a single output instead.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    if spec.get("combine"):
+        try:
+            yield process_combined(inputs, spec, output_dir)
+        except Exception as e:
+            yield {"input": f"{len(inputs)} files", "error": f"{type(e).__name__}: {e}"}
+        return
+    if workers <= 1 or len(inputs) <= 1:
+        for input_path in inputs:
+            yield process_file_safely(input_path, spec, output_dir)
+        return
+    with ProcessPoolExecutor(min(workers, len(inputs))) as pool:
+        futures = [pool.submit(process_file_safely, input_path, spec, output_dir) for input_path in inputs]
+        for future in as_completed(futures):
+            yield future.result()
+
+def main(argv=None):
+    """Headless batch runner: apply a pipeline spec to every file in a directory"""
+    parser = argparse.ArgumentParser(
+        description="Run a JSON pipeline spec (load → clean → filter → export) over a directory of files"
+    )
+    parser.add_argument("spec", help="JSON pipeline spec")
+    parser.add_argument("inputs", help="Input file or directory")
+    parser.add_argument("-o", "--output", default="processed", help="Output directory (default: processed)")
+    parser.add_argument("-w", "--workers", type=int, default=os.cpu_count() or 1,
+                        help="Files processed in parallel (default: CPU count)")
+    parser.add_argument("--json", action="store_true", help="Print one JSON result per line")
+    args = parser.parse_args(argv)
+
+    try:
+        spec = load_pipeline_spec(args.spec)
+        inputs = batch_inputs(args.inputs, spec["input"].get("pattern"))
+    except (OSError, ValueError) as e:
+        print(f"❌ {e}", file=sys.stderr)
+        return 2
+    if not inputs:
+        print(f"❌ No input files found in {args.inputs}", file=sys.stderr)
+        return 2
+
+    start = time.perf_counter()
+    failed = rows = 0
+    total_mb = 0.0
+    for result in run_batch(spec, inputs, args.output, args.workers):
+        name = os.path.basename(result["input"].rstrip("/\\"))
+        if "error" in result:
+            failed += 1
+        else:
+            rows += result["rows_in"]
+            total_mb += result["input_mb"]
+        if args.json:
+            print(json.dumps(result), flush=True)
+        elif "error" in result:
+            print(f"❌ {name}: {result['error']}", flush=True)
+        else:
+            print(f"✅ {name}: {result['rows_in']:,} → {result['rows_out']:,} rows in {result['seconds']:.2f}s "
+                  f"({result['mb_per_s']:.1f} MB/s, {result['rows_per_s']:,.0f} rows/s)", flush=True)
+    elapsed = max(time.perf_counter() - start, 1e-9)
+    if not args.json:
+        print(f"{len(inputs) - failed}/{len(inputs)} files, {rows:,} rows, {total_mb:.1f} MB in {elapsed:.2f}s "
+              f"({total_mb / elapsed:.1f} MB/s overall)")
+    return 1 if failed else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -78,19 +78,13 @@ def main():
     print("=" * 50)
     
     try:
-        # Import and run the application
-        from code import DataProcessorApp
-        import sys
-        from PyQt5.QtWidgets import QApplication
+        # Import and run the application; main() shows the window before the
+        # heavy libraries load (python run.py --startup-report prints the timings)
+        from code import main as run_application
         
-        app = QApplication(sys.argv)
-        window = DataProcessorApp()
-        window.show()
-        
-        print("✅ Application launched successfully!")
         print("💡 Tip: Use the sample_data.csv file to test the application")
         
-        return app.exec_()
+        return run_application()
         
     except ImportError as e:
         print(f"❌ Import error: {e}")
@@ -29,6 +29,7 @@ setup(
     long_description_content_type="text/markdown",
     url="https://github.com/yourusername/advanced-data-processor",
     packages=find_packages(),
+    py_modules=["code", "processor"],
     classifiers=[
         "Development Status :: 5 - Production/Stable",
         "Intended Audience :: Developers",
@@ -58,6 +59,7 @@ setup(
     entry_points={
         "console_scripts": [
             "data-processor=code:main",
+            "data-processor-batch=processor:main",
         ],
     },
     include_package_data=True,
@@ -0,0 +1,354 @@
+"""Checks for the processing core against plain pandas.
+
+    pytest -q
+
+"python -m pytest" would put code.py ahead of the stdlib module pdb imports.
+"""
+
+import pathlib
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import processor
+
+SAMPLE_CSV = pathlib.Path(__file__).with_name("sample_data.csv")
+
+
+@pytest.fixture
+def typed_csv(tmp_path):
+    """CSV whose nulls and text only appear in the second half, so byte ranges guess different dtypes"""
+    rows = 20000
+    half = rows // 2
+    df = pd.DataFrame({
+        "flag": np.tile([True, False], half),
+        "count": np.arange(rows),
+        "ratio": np.linspace(0, 1, rows),
+        "code": np.arange(rows).astype(str),
+    })
+    df["flag"] = df["flag"].astype(object)
+    df.loc[rows - 5, "flag"] = None
+    df["count"] = df["count"].astype(object)
+    df.loc[rows - 3, "count"] = None
+    df.loc[rows - 1, "ratio"] = None
+    df.loc[rows - 2, "code"] = "n/a"
+    path = tmp_path / "typed.csv"
+    df.to_csv(path, index=False)
+    return path
+
+
+def test_read_csv_parallel_matches_single_read(typed_csv):
+    expected = pd.read_csv(typed_csv)
+    result = processor.read_csv_parallel(str(typed_csv), workers=2)
+    pd.testing.assert_frame_equal(result, expected)
+    assert int((result["flag"] == True).sum()) == int((expected["flag"] == True).sum())  # noqa: E712
+
+
+@pytest.mark.parametrize("condition", ["Age * 4 > 100", "Age * 1000 > 30000", "-Age < -30", "Age / 4 > 8"])
+def test_filter_arithmetic_survives_compact_mode(condition):
+    df = pd.read_csv(SAMPLE_CSV)
+    compacted, _ = processor.compact_dataframe(df.copy())
+    expected = df.eval(condition).to_numpy()
+    np.testing.assert_array_equal(processor.filter_mask(compacted, condition), expected)
+
+
+@pytest.mark.parametrize("condition", ["Country < 'M'", "Country == Department", "Department != Country",
+                                       "Country >= 'C' and Age > 30", "Country == 'USA'"])
+def test_filters_on_categorical_text_match_plain_text(condition):
+    df = pd.read_csv(SAMPLE_CSV)
+    df.loc[3, "Country"] = None
+    categorical = df.astype({"Country": "category", "Department": "category"})
+    expected = df.eval(condition, engine="python").to_numpy(dtype=bool)
+    np.testing.assert_array_equal(processor.filter_mask(categorical, condition), expected)
+
+
+def test_compact_mode_keeps_mostly_distinct_text_as_text():
+    compacted, _ = processor.compact_dataframe(pd.read_csv(SAMPLE_CSV))
+    assert not any(isinstance(dtype, pd.CategoricalDtype) for dtype in compacted.dtypes)
+    repeated, _ = processor.compact_dataframe(pd.DataFrame({"city": ["Oslo", "Lima"] * 100}))
+    assert isinstance(repeated["city"].dtype, pd.CategoricalDtype)
+
+
+@pytest.fixture
+def frame():
+    rng = np.random.default_rng(7)
+    rows = 3000
+    df = pd.DataFrame({
+        "id": rng.integers(0, 400, rows),
+        "score": rng.normal(50, 15, rows).round(1),
+        "city": rng.choice(["Oslo", "Lima", "Pune", None], rows),
+        "flag": rng.choice([True, False], rows),
+    })
+    df.loc[rng.choice(rows, 200, replace=False), "score"] = np.nan
+    return df
+
+
+KEEP_MODES = [("first", "first"), ("last", "last"), ("none", False)]
+
+
+@pytest.mark.parametrize("keep, pandas_keep", KEEP_MODES)
+@pytest.mark.parametrize("subset", [None, ["id"], ["id", "city"]])
+def test_dedupe_mask_matches_duplicated(frame, subset, keep, pandas_keep):
+    expected = ~frame.duplicated(subset=subset, keep=pandas_keep).to_numpy()
+    np.testing.assert_array_equal(processor.dedupe_mask(frame, subset, keep), expected)
+
+
+def streaming_keep_mask(deduper, chunks):
+    if deduper.needs_count:
+        for chunk in chunks:
+            deduper.count(chunk)
+        deduper.restart()
+    return np.concatenate([deduper.keep_mask(chunk) for chunk in chunks])
+
+
+@pytest.mark.parametrize("keep, pandas_keep", KEEP_MODES)
+@pytest.mark.parametrize("subset", [None, ["id"], ["score", "city"]])
+def test_streaming_deduplicator_matches_duplicated(frame, subset, keep, pandas_keep):
+    chunks = [frame.iloc[start:start + 250] for start in range(0, len(frame), 250)]
+    result = streaming_keep_mask(processor.StreamingDeduplicator(subset, keep), chunks)
+    np.testing.assert_array_equal(result, ~frame.duplicated(subset=subset, keep=pandas_keep).to_numpy())
+
+
+def test_streaming_deduplicator_keeps_large_integer_keys_apart():
+    chunk = pd.DataFrame({"id": [2 ** 60, 2 ** 60 + 1, 2 ** 60]})
+    result = processor.StreamingDeduplicator(["id"]).keep_mask(chunk)
+    np.testing.assert_array_equal(result, [True, True, False])
+
+
+def test_streaming_deduplicator_matches_ints_and_floats_across_chunks():
+    deduper = processor.StreamingDeduplicator(["id"])
+    deduper.keep_mask(pd.DataFrame({"id": [1, 2]}))
+    result = deduper.keep_mask(pd.DataFrame({"id": [2.0, np.nan, 3.5, 1.0]}))
+    np.testing.assert_array_equal(result, [False, True, True, False])
+
+
+def test_streaming_deduplicator_verifies_hash_collisions():
+    deduper = processor.StreamingDeduplicator(["city"])
+    deduper.row_hashes = lambda keys: np.zeros(len(keys), dtype=np.uint64)  # Every key collides
+    first = deduper.keep_mask(pd.DataFrame({"city": ["Oslo", "Lima", "Oslo", None, None]}))
+    second = deduper.keep_mask(pd.DataFrame({"city": ["Lima", "Pune", None]}))
+    np.testing.assert_array_equal(first, [True, True, False, True, False])
+    np.testing.assert_array_equal(second, [False, True, False])
+
+
+@pytest.mark.parametrize("keep", ["first", "last", "none"])
+def test_streaming_pipeline_dedupes_across_files(frame, tmp_path, keep):
+    inputs = [tmp_path / "a.csv", tmp_path / "b.csv"]
+    frame.iloc[:1700].to_csv(inputs[0], index=False)
+    frame.iloc[1700:].to_csv(inputs[1], index=False)
+    steps = [{"op": "dedupe", "subset": ["id", "city"], "keep": keep}, {"op": "filter", "condition": "score > 40"}]
+    plan = processor.LazyPlan()
+    plan.steps = [dict(step) for step in steps]
+    pipeline = processor.StreamingPipeline(plan, [str(path) for path in inputs], "CSV", 400)
+    pipeline.prepare()
+    pipeline.run(str(tmp_path / "out.csv"))
+    expected = processor.apply_steps(pd.concat(map(pd.read_csv, inputs), ignore_index=True), steps)
+    result = pd.read_csv(tmp_path / "out.csv")
+    assert len(result)
+    pd.testing.assert_frame_equal(result, expected.reset_index(drop=True))
+
+
+@pytest.mark.parametrize("keep", ["first", "last", "none"])
+def test_streaming_dedupe_after_filter_that_empties_first_chunks(frame, tmp_path, keep):
+    source = tmp_path / "in.csv"
+    frame.assign(row=np.arange(len(frame))).to_csv(source, index=False)
+    steps = [{"op": "filter", "condition": "row > 120"}, {"op": "dedupe", "subset": ["id", "score"], "keep": keep}]
+    plan = processor.LazyPlan()
+    plan.steps = [dict(step) for step in steps]
+    pipeline = processor.StreamingPipeline(plan, str(source), "CSV", 20)
+    pipeline.prepare()
+    pipeline.run(str(tmp_path / "out.csv"))
+    expected = processor.apply_steps(pd.read_csv(source), steps)
+    pd.testing.assert_frame_equal(pd.read_csv(tmp_path / "out.csv"), expected.reset_index(drop=True))
+
+
+def test_streaming_pipeline_writes_output_without_rows(tmp_path):
+    source = tmp_path / "empty.jsonl"
+    source.write_text("")
+    pipeline = processor.StreamingPipeline(processor.LazyPlan(), str(source), "JSON Lines", 100)
+    pipeline.prepare()
+    pipeline.run(str(tmp_path / "out.csv"))
+    assert (tmp_path / "out.csv").exists()
+
+
+FILTERS = [
+    "score > 50",
+    "city == 'Oslo'",
+    "city != 'Oslo'",
+    "id in [1, 2, 3, 250]",
+    "id not in [1, 2, 3]",
+    "score > 40 and city == 'Lima'",
+    "not (id < 100) or score <= 20",
+    "(score > 40) & (city == 'Lima')",
+    "(id < 100) | ~(score <= 20)",
+    "20 < score < 60",
+    "id * 2 + 1 > 300",
+    "score.isnull()",
+    "city.notna()",
+]
+
+
+@pytest.mark.parametrize("condition", FILTERS)
+def test_compiled_filter_matches_pandas_eval(frame, condition):
+    assert processor.FILTER_ENGINE.compile(condition) is not None
+    expected = frame.eval(condition, engine="python").to_numpy(dtype=bool)
+    np.testing.assert_array_equal(processor.filter_mask(frame, condition), expected)
+
+
+@pytest.mark.parametrize("condition", FILTERS)
+def test_sql_pushdown_matches_filter_mask(frame, tmp_path, condition):
+    db_path = str(tmp_path / "data.db")
+    processor.write_sqlite(frame.assign(row=np.arange(len(frame))), db_path, "data")
+    report = {}
+    chunks = list(processor.iter_sqlite_chunks(db_path, 1000, source_options={"condition": condition},
+                                               report=report))
+    assert report["pushed_down"]
+    rows = pd.concat(chunks)["row"].to_numpy() if chunks else np.array([], dtype=np.int64)
+    np.testing.assert_array_equal(np.sort(rows), np.flatnonzero(processor.filter_mask(frame, condition)))
+
+
+@pytest.mark.parametrize("decode", [True, False])
+def test_columnar_store_round_trips_nullable_and_tz_columns(tmp_path, decode):
+    df = pd.DataFrame({
+        "i": pd.array([1, None, 3], dtype="Int64"),
+        "f": pd.array([1.5, None, 2.0], dtype="Float64"),
+        "b": pd.array([True, None, False], dtype="boolean"),
+        "ob": [True, np.nan, False],
+        "t": pd.to_datetime(["2024-01-01", None, "2024-03-01"]).tz_localize("Europe/Paris"),
+    })
+    store = str(tmp_path / "data.dpc")
+    processor.write_columnar(df, store)
+    loaded = processor.read_columnar(store, mmap_mode="r", decode_dictionary=decode)
+    pd.testing.assert_frame_equal(loaded, df)
+    np.testing.assert_array_equal(processor.filter_mask(loaded, "i > 1"), [False, False, True])
+
+
+def test_journal_undo_and_redo_restore_each_state(frame):
+    journal = processor.OperationJournal()
+    states = [frame.copy()]
+    df = frame.copy()
+    df = journal.remove_rows(df, processor.filter_mask(df, "score > 30"), "filter")
+    states.append(df.copy())
+    df = journal.fill_nulls(df, "city", "Unknown", "fill")
+    states.append(df.copy())
+    df = journal.remove_rows(df, processor.dedupe_mask(df, ["id"], "last"), "dedupe")
+    states.append(df.copy())
+    df = journal.rename_column(df, "score", "points", "rename")
+    states.append(df.copy())
+
+    for expected in reversed(states[:-1]):
+        df, _ = journal.undo(df)
+        pd.testing.assert_frame_equal(df, expected)
+    assert not journal.can_undo()
+    for expected in states[1:]:
+        df, _ = journal.redo(df)
+        pd.testing.assert_frame_equal(df, expected)
+
+
+def test_failed_lazy_plan_leaves_journal_unchanged(frame):
+    journal = processor.OperationJournal()
+    df = journal.remove_rows(frame.copy(), processor.filter_mask(frame, "id > 10"), "filter")
+    plan = processor.LazyPlan()
+    plan.add("dropna")
+    plan.add("fill", column="score")
+    plan.add("filter", condition="nosuch > 1")
+    with pytest.raises(pd.errors.UndefinedVariableError):
+        plan.run(df.copy(deep=False), journal)
+    assert len(journal.undo_stack) == 1
+    assert len(plan) == 3
+    df, _ = journal.undo(df)
+    pd.testing.assert_frame_equal(df, frame)
+
+    # A fill that added a category is reverted on the filtered frame, not the caller's
+    categorical = pd.DataFrame({"a": [1, 2, 3, 4], "c": pd.Categorical(["x", None, None, None])})
+    journal = processor.OperationJournal()
+    plan = processor.LazyPlan()
+    plan.add("filter", condition="a != 1")
+    plan.add("fill", column="c")
+    plan.add("filter", condition="nosuch > 1")
+    with pytest.raises(pd.errors.UndefinedVariableError):
+        plan.run(categorical.copy(deep=False), journal)
+    assert not journal.can_undo() and not journal.can_redo()
+
+
+def eager(df, steps):
+    """Each step on its own with plain pandas"""
+    for step in steps:
+        if step["op"] == "dropna":
+            df = df.dropna()
+        elif step["op"] == "dedupe":
+            keep = step.get("keep", "first")
+            df = df.drop_duplicates(subset=step.get("subset"), keep=keep if keep != "none" else False)
+        elif step["op"] == "filter":
+            df = df[df.eval(step["condition"], engine="python").to_numpy(dtype=bool)]
+        elif step["op"] == "fill":
+            df = df.fillna({step["column"]: processor.null_fill_value(df[step["column"]])})
+        else:
+            df = df.rename(columns={step["column"]: step["new_name"]})
+    return df
+
+
+@pytest.mark.parametrize("steps", [
+    [{"op": "filter", "condition": "score > 40"}, {"op": "dropna"}, {"op": "dedupe"}],
+    [{"op": "fill", "column": "score"}, {"op": "dedupe", "subset": ["id"], "keep": "last"},
+     {"op": "filter", "condition": "score > 50"}],
+    [{"op": "dedupe", "subset": ["city"], "keep": "none"}, {"op": "dropna"}],
+    [{"op": "filter", "condition": "id < 300"}, {"op": "fill", "column": "city"},
+     {"op": "rename", "column": "city", "new_name": "town"}, {"op": "dedupe", "subset": ["town", "flag"]},
+     {"op": "fill", "column": "score"}],
+])
+def test_lazy_plan_matches_eager_steps(frame, steps):
+    result = processor.apply_steps(frame.copy(), steps, processor.OperationJournal())
+    pd.testing.assert_frame_equal(result, eager(frame.copy(), steps))
+
+
+@pytest.fixture
+def timestamps():
+    rng = np.random.default_rng(3)
+    return pd.DataFrame({"t": 1.7e9 + rng.integers(0, 10, 5000), "u": 1.7e12 + rng.normal(0, 5, 5000)})
+
+
+def test_column_stats_std_is_stable_for_large_values(timestamps):
+    column_stats = processor.ColumnStats()
+    journal = processor.OperationJournal(on_change=column_stats.apply_change)
+    df = timestamps
+    for _ in range(2):
+        for col in df.columns:
+            stats = column_stats.get(df, col)
+            mean, std = processor.shifted_mean_std(stats["count"], stats["shift"], stats["sum"], stats["sumsq"])
+            assert mean == pytest.approx(df[col].mean(), rel=1e-12)
+            assert std == pytest.approx(df[col].std(), rel=1e-6)
+        df = journal.remove_rows(df, (df["t"] % 2 == 0).to_numpy(), "filter")
+
+
+def test_column_sketch_std_is_stable_for_large_values(timestamps):
+    sketch = processor.DatasetSketch(0.01)
+    for start in range(0, len(timestamps), 1000):
+        sketch.update(timestamps.iloc[start:start + 1000])
+    for col, column in sketch.columns.items():
+        mean, std = processor.shifted_mean_std(column.count, column.shift, column.sum, column.sumsq)
+        assert mean == pytest.approx(timestamps[col].mean(), rel=1e-12)
+        assert std == pytest.approx(timestamps[col].std(), rel=1e-6)
+
+
+def test_streamed_excel_sheets_keep_the_first_chunk_columns(tmp_path):
+    openpyxl = pytest.importorskip("openpyxl")
+    workbook = openpyxl.Workbook()
+    first = workbook.active
+    first.title = "A"
+    for row in (["a", "b", "c"], [1, 2], [3, None, 5], [6]):
+        first.append(row)
+    second = workbook.create_sheet("B")
+    for row in (["b", "a"], [7, 8]):
+        second.append(row)
+    source = str(tmp_path / "book.xlsx")
+    workbook.save(source)
+
+    pipeline = processor.StreamingPipeline(processor.LazyPlan(), source, "Excel", 1,
+                                           source_options={"sheets": ["A", "B"]})
+    pipeline.prepare()
+    pipeline.run(str(tmp_path / "out.csv"))
+    expected = pd.DataFrame({"Sheet": ["A", "A", "A", "B"], "a": [1, 3, 6, 8], "b": [2, None, None, 7],
+                             "c": [None, 5, None, None]})
+    pd.testing.assert_frame_equal(pd.read_csv(tmp_path / "out.csv"), expected)